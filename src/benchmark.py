@@ -1,13 +1,28 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
-# Cargar datos
-df = pd.read_csv('../results/oa_metrics.csv', parse_dates=['timestamp'])
+from oa_store import MetricsStore, RESULTS_DIR
+from oa_stats import summarize_runs, method_sgm
+
+# Cargar datos (todas las ejecuciones del almacén SQLite)
+with MetricsStore() as store:
+    df = store.runs()
 
 
 # Filtros deseados
 
+# Resumen de las repeticiones: mediana, IQR y media geométrica desplazada,
+# por separado para las ejecuciones en caliente y las de arranque en frío
+summarize_runs(df).to_csv(f"{RESULTS_DIR}/benchmark_summary.csv", index=False)
+if 'cold' in df:
+    summarize_runs(df[df['cold'] == 1], include_cold=True).to_csv(
+        f"{RESULTS_DIR}/benchmark_summary_cold.csv", index=False)
+print(method_sgm(df).sort_values('sgm').to_string(index=False))
+
+# Las figuras usan solo las ejecuciones en caliente (cold nulo: sin repeticiones)
+if 'cold' in df:
+    df = df[df['cold'].fillna(0) == 0]
+
 # Etiqueta para OA
 df['instance'] = df.apply(lambda r: f"OA({r.N},{r.k},{r.s},{r.t})", axis=1)
 
@@ -18,14 +33,37 @@ sns.barplot(
     x='instance',
     y='runtime_sec',
     hue='method',
-    ci='sd',
+    estimator='median',
+    errorbar=('pi', 50),  # de Q1 a Q3
     capsize=.2
 )
 plt.yscale('log')  # útil si hay valores muy grandes
 plt.xlabel("Instancia (OA)")
-plt.ylabel("Tiempo de cómputo (s)")
+plt.ylabel("Tiempo de cómputo (s), mediana y Q1–Q3")
 plt.title("Comparación general de tiempos de cómputo para OAs")
 plt.legend(title="Método")
 plt.tight_layout()
 plt.savefig('../figures/GlobalComparison.png')
 plt.show()
+
+# Distancia de cada método a la construcción algebraica (runtime / baseline_sec)
+ratios = df.dropna(subset=['baseline_ratio']) if 'baseline_ratio' in df else df.iloc[0:0]
+if not ratios.empty:
+    plt.figure(figsize=(12, 6))
+    sns.barplot(
+        data=ratios,
+        x='instance',
+        y='baseline_ratio',
+        hue='method',
+        estimator='median',
+        errorbar=('pi', 50),
+        capsize=.2
+    )
+    plt.yscale('log')
+    plt.xlabel("Instancia (OA)")
+    plt.ylabel("Tiempo / tiempo de la construcción algebraica")
+    plt.title("Distancia a la construcción algebraica (Rao–Hamming / Bush)")
+    plt.legend(title="Método")
+    plt.tight_layout()
+    plt.savefig('../figures/BaselineRatio.png')
+    plt.show()
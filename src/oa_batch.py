@@ -0,0 +1,220 @@
+import argparse
+import multiprocessing as mp
+import os
+import signal
+import sys
+import time
+
+from oa_methods import INSTANCIAS_PREDEF, METODOS, run_method, acepta
+from oa_utils import oa_strength, log_oa_result
+from oa_store import new_run_id
+from oa_generators.instrumentation import RunStats
+
+
+def kill_grace(timeout):
+    """
+    Margen (s) tras el límite antes de matar una celda cuyo método respeta
+    time_limit: así puede terminar por sí misma y registrar su estado y su
+    OA parcial.
+    """
+    return max(10.0, 0.05 * timeout)
+
+
+def _cold(rep, repeticiones):
+    """
+    Marca de arranque en frío de la repetición rep. Con una sola repetición
+    no hay ejecuciones en caliente con las que compararla, así que queda nula
+    y cuenta como una ejecución normal en los resúmenes.
+    """
+    return int(rep == 0) if repeticiones > 1 else None
+
+
+def _limite(metodo, timeout):
+    """
+    Límite de reloj de una celda. Comprobar si el método acepta time_limit
+    importa su módulo en el padre; si el solver no está instalado la celda
+    fallará por sí misma con el error de importación, así que basta timeout.
+    """
+    try:
+        return timeout + kill_grace(timeout) if acepta(metodo, "time_limit") else timeout
+    except ImportError:
+        return timeout
+
+
+def _run_cell(N, k, s, t, metodo, cores, log_path, conn, time_limit=None, repeticiones=1, semilla=None,
+              traza_heap=False):
+    """
+    Proceso hijo: ejecuta una celda (instancia, método) y envía el resultado
+    (incluida la matriz en "oa" si el método devolvió una). Si el método
+    acepta time_limit se le pasa, para que pare por sí mismo.
+    Con repeticiones > 1 el método se ejecuta varias veces seguidas en el
+    mismo proceso y se envía un resultado por repetición. Solo la primera
+    paga el arranque en frío (importar el solver, obtener la licencia) y se
+    marca con cold = 1 (ver _cold). Si se da semilla, la repetición r usa
+    solver_seed = semilla + r en los métodos que la aceptan. traza_heap
+    activa la medida del heap de Python (ver oa_methods.run_method).
+    Crea su propio grupo de procesos para que el padre pueda matar también
+    los procesos de solver que lance Pyomo si se agota el tiempo.
+    """
+    os.setsid()
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    with open(log_path, "w") as log:
+        os.dup2(log.fileno(), sys.stdout.fileno())
+        os.dup2(log.fileno(), sys.stderr.fileno())
+        for rep in range(repeticiones):
+            stats = RunStats()
+            kwargs = {"stats": stats}
+            try:
+                if time_limit is not None and acepta(metodo, "time_limit"):
+                    kwargs["time_limit"] = time_limit
+                if semilla is not None and acepta(metodo, "solver_seed"):
+                    kwargs["solver_seed"] = semilla + rep
+                oa, runtime = run_method(metodo, N, k, s, t, traza_heap=traza_heap, **kwargs)
+                if oa is None:
+                    nota = f"timeout ({time_limit} s)" if stats.status == "timeout" else "sin solución"
+                    result = {"runtime": runtime, "feasible": False, "notes": nota}
+                else:
+                    feasible = oa_strength(oa) >= t
+                    result = {"runtime": runtime, "feasible": feasible, "notes": "", "oa": oa}
+            except Exception as e:
+                result = {"runtime": None, "feasible": False, "notes": f"error: {e}"}
+            result["metrics"] = stats.as_metrics()
+            result["metrics"].update(rep=rep, cold=_cold(rep, repeticiones), solver_seed=kwargs.get("solver_seed"))
+            conn.send(result)
+            sys.stdout.flush()
+
+
+def _parse_instancia(texto):
+    """Acepta el índice (1..) de una instancia predefinida o 'N,k,s,t'."""
+    if "," in texto:
+        return tuple(int(x) for x in texto.split(","))
+    return INSTANCIAS_PREDEF[int(texto) - 1]
+
+
+def run_batch(instancias, metodos, workers=1, timeout=3600, cores_por_celda=1,
+              notes="batch", log_dir=os.path.join("..", "results", "batch_logs"),
+              repeticiones=1, semilla=None, traza_heap=False):
+    """
+    Ejecuta sin interacción la rejilla instancias × métodos.
+
+    Cada celda corre en su propio proceso, fijado a cores_por_celda núcleos
+    exclusivos y con su propio límite de tiempo de reloj. Como mucho hay
+    'workers' celdas a la vez. Los resultados se registran con log_oa_result
+    en cuanto termina cada celda y la salida de cada una queda en log_dir.
+    A los métodos que aceptan time_limit se les pasa timeout y solo se matan
+    pasado kill_grace(timeout); al resto se les mata al llegar a timeout.
+
+    Con repeticiones > 1 cada celda ejecuta el método ese número de veces en
+    el mismo proceso (ver _run_cell) y timeout se aplica a cada repetición.
+    Se registra cada repetición por separado con rep, cold y solver_seed, y
+    todas las filas del lote comparten batch_id. Si una repetición agota el
+    tiempo, la celda se mata y no se ejecutan las que faltan.
+    """
+    batch_id = new_run_id()
+    os.makedirs(log_dir, exist_ok=True)
+    ctx = mp.get_context("fork")
+    n_cpus = os.cpu_count() or 1
+    free_cores = list(range(n_cpus))
+    if workers * cores_por_celda > n_cpus:
+        print(f"[oa_batch] Aviso: {workers} workers × {cores_por_celda} núcleos > {n_cpus} CPUs; "
+              "las celdas compartirán núcleos.")
+
+    pending = [(inst, metodo) for inst in instancias for metodo in metodos]
+    running = {}  # proceso -> (instancia, método, conn, núcleos, inicio)
+    total = len(pending)
+
+    while pending or running:
+        # Lanzar celdas mientras haya hueco
+        while pending and len(running) < workers:
+            (N, k, s, t), metodo = pending.pop(0)
+            if len(free_cores) >= cores_por_celda:
+                cores = [free_cores.pop(0) for _ in range(cores_por_celda)]
+            else:
+                cores = []
+            log_path = os.path.join(log_dir, f"oa_{N}_{k}_{s}_{t}_{metodo}.log")
+            parent_conn, child_conn = ctx.Pipe(duplex=False)
+            p = ctx.Process(target=_run_cell, args=(N, k, s, t, metodo, cores, log_path, child_conn, timeout,
+                                                    repeticiones, semilla, traza_heap))
+            p.start()
+            child_conn.close()
+            limit = _limite(metodo, timeout)
+            running[p] = [(N, k, s, t), metodo, parent_conn, cores, time.time(), limit, 0]
+            print(f"[oa_batch] Lanzada OA({N},{k},{s},{t}) con {metodo} en núcleos {cores or 'todos'}")
+
+        time.sleep(0.2)
+
+        for p in list(running):
+            (N, k, s, t), metodo, conn, cores, start, limit, rep = running[p]
+            elapsed = time.time() - start
+            result = None
+            if conn.poll():
+                try:
+                    result = conn.recv()
+                except EOFError:
+                    result = None
+            if result is None and p.is_alive() and elapsed < limit:
+                continue
+
+            finished = result is None
+            if result is None and p.is_alive():
+                # Tiempo agotado: matar el grupo entero (incluidos los solvers hijos)
+                os.killpg(p.pid, signal.SIGKILL)
+                result = {"runtime": elapsed, "feasible": False, "notes": f"timeout ({timeout} s)",
+                          "metrics": {"status": "timeout", "rep": rep, "cold": _cold(rep, repeticiones)}}
+            elif result is None:
+                result = {"runtime": elapsed, "feasible": False,
+                          "notes": f"proceso terminado (código {p.exitcode})",
+                          "metrics": {"rep": rep, "cold": _cold(rep, repeticiones)}}
+
+            runtime = result["runtime"] if result["runtime"] is not None else elapsed
+            log_oa_result(N, k, s, t, metodo, runtime, result["feasible"], quality=None,
+                          notes=f"{notes}; {result['notes']}" if result["notes"] else notes,
+                          metrics=dict(result.get("metrics") or {}, batch_id=batch_id))
+            rep += 1
+            if not finished and rep < repeticiones:
+                # La siguiente repetición empieza ahora, con su propio límite
+                running[p][4] = time.time()
+                running[p][6] = rep
+                print(f"[oa_batch] OA({N},{k},{s},{t}) {metodo} rep {rep}/{repeticiones}: "
+                      f"factible={result['feasible']} t={runtime:.2f}s")
+                continue
+
+            p.join()
+            conn.close()
+            free_cores.extend(cores)
+            del running[p]
+            total -= 1
+            print(f"[oa_batch] OA({N},{k},{s},{t}) {metodo}: factible={result['feasible']} "
+                  f"t={runtime:.2f}s ({total} pendientes)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Ejecuta sin interacción la rejilla instancias × métodos de generación de OAs.")
+    parser.add_argument("--instancias", nargs="+", default=None,
+                        help="Índices (1..) de instancias predefinidas o 'N,k,s,t'. Por defecto todas.")
+    parser.add_argument("--metodos", nargs="+", default=None, choices=list(METODOS),
+                        help="Métodos a ejecutar. Por defecto todos.")
+    parser.add_argument("--workers", type=int, default=1, help="Celdas ejecutadas a la vez.")
+    parser.add_argument("--timeout", type=float, default=3600, help="Límite de tiempo por celda (s).")
+    parser.add_argument("--cores", type=int, default=1, help="Núcleos fijados a cada celda.")
+    parser.add_argument("--notes", default="batch", help="Nota registrada en cada resultado.")
+    parser.add_argument("--repeticiones", type=int, default=1,
+                        help="Ejecuciones de cada celda en el mismo proceso; si son más de una, la "
+                             "primera se marca como arranque en frío (cold = 1).")
+    parser.add_argument("--semilla", type=int, default=None,
+                        help="Semilla base del solver: la repetición r usa semilla + r.")
+    parser.add_argument("--heap", action="store_true",
+                        help="Mide también el pico del heap de Python con tracemalloc (más lento).")
+    args = parser.parse_args(argv)
+
+    instancias = [_parse_instancia(x) for x in args.instancias] if args.instancias else INSTANCIAS_PREDEF
+    metodos = args.metodos or list(METODOS)
+    run_batch(instancias, metodos, workers=args.workers, timeout=args.timeout,
+              cores_por_celda=args.cores, notes=args.notes,
+              repeticiones=args.repeticiones, semilla=args.semilla, traza_heap=args.heap)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import os
+
+import numpy as np
+
+from oa_utils import oa_strength, load_oa_csv, export_oa_to_csv, validate_oa
+
+DATA_DIR = os.path.join("..", "data")
+
+# Formato .oab: una secuencia de registros, cada uno con una cabecera fija
+# de 76 bytes seguida de la matriz N x k por filas (un uint8 por celda, o un
+# bit por celda con packbits si packed = 1, solo para s = 2). Varios OAs
+# pueden compartir archivo y añadirse al final sin reescribir nada. t es la
+# fuerza pedida y strength la detectada al validar (0 si no se validó; en los
+# archivos anteriores el campo estaba reservado y vale 0).
+MAGIC = b"OAB1"
+HEADER = np.dtype([
+    ("magic", "S4"),
+    ("N", "<u4"),
+    ("k", "<u4"),
+    ("s", "<u2"),
+    ("t", "<u2"),
+    ("packed", "u1"),
+    ("status", "u1"),
+    ("strength", "<u2"),
+    ("nbytes", "<u8"),
+    ("method", "S48"),
+])
+
+# Estado de validación guardado en la cabecera
+NOT_VALIDATED, VALID, INVALID = 0, 1, 2
+STATUS_NAMES = {NOT_VALIDATED: "no validada", VALID: "válida", INVALID: "no válida"}
+
+
+def _path(filename):
+    return os.path.join(DATA_DIR, filename)
+
+
+def write_oa_binary(oa, filename, method="", s=None, t=None, validate=True, pack=False):
+    """
+    Añade una OA al final del archivo binario data/filename (lo crea si no
+    existe). s es el número de símbolos de la OA pedida; si no se da se
+    deduce de la matriz (máximo + 1), lo que falla si la OA no usa el
+    símbolo más alto. La cabecera guarda el t pedido y, con validate, la
+    fuerza detectada con oa_strength y si cumple t (o t >= 1 si no se da t);
+    sin t se guarda como t la fuerza detectada. pack guarda un bit por celda
+    (solo s = 2), a costa de que la carga ya no sea sin copia.
+    Devuelve el índice del registro dentro del archivo.
+    """
+    oa = np.asarray(oa)
+    N, k = oa.shape
+    if s is None:
+        s = int(oa.max()) + 1
+    elif oa.size and (oa.min() < 0 or oa.max() >= s):
+        raise ValueError(f"La matriz tiene símbolos fuera de 0..{s - 1}")
+    if s > 255:
+        raise ValueError("El formato binario admite como mucho 255 símbolos")
+    if pack and s > 2:
+        raise ValueError("pack solo es válido para s = 2")
+
+    status = NOT_VALIDATED
+    detected = 0
+    if validate:
+        # Si falta alguno de los s símbolos no hay ni fuerza 1 (oa_strength
+        # mediría la fuerza sobre los símbolos presentes)
+        detected = oa_strength(oa) if len(np.unique(oa)) == s else 0
+        status = VALID if detected >= max(1, t or 0) else INVALID
+        if t is None:
+            t = detected
+    data = np.packbits(oa.astype(np.uint8), axis=None) if pack else oa.astype(np.uint8)
+
+    header = np.zeros(1, dtype=HEADER)
+    header[0] = (MAGIC, N, k, s, t or 0, int(pack), status, detected, data.nbytes, method.encode()[:48])
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    index = sum(1 for _ in _records(_open(filename))) if os.path.exists(_path(filename)) else 0
+    with open(_path(filename), "ab") as f:
+        f.write(header.tobytes())
+        f.write(data.tobytes())
+    return index
+
+
+def _open(filename):
+    """np.memmap de solo lectura del archivo (array vacío si el archivo lo está)."""
+    path = _path(filename)
+    if os.path.getsize(path) == 0:
+        return np.empty(0, dtype=np.uint8)
+    return np.memmap(path, dtype=np.uint8, mode="r")
+
+
+def _records(mm):
+    """Genera (cabecera, desplazamiento de la matriz) recorriendo solo las cabeceras."""
+    offset = 0
+    while offset < mm.size:
+        header = mm[offset:offset + HEADER.itemsize].view(HEADER)[0]
+        if header["magic"] != MAGIC:
+            raise ValueError(f"Registro corrupto en el byte {offset}")
+        offset += HEADER.itemsize
+        yield header, offset
+        offset += int(header["nbytes"])
+
+
+def _header_dict(header):
+    return {"N": int(header["N"]), "k": int(header["k"]), "s": int(header["s"]),
+            "t": int(header["t"]), "strength": int(header["strength"]),
+            "method": header["method"].decode(errors="ignore"),
+            "status": STATUS_NAMES[int(header["status"])], "packed": bool(header["packed"])}
+
+
+def _matrix(mm, header, offset):
+    N, k = int(header["N"]), int(header["k"])
+    data = mm[offset:offset + int(header["nbytes"])]
+    if header["packed"]:
+        return np.unpackbits(data, count=N * k).reshape(N, k)
+    return data.reshape(N, k)
+
+
+def iter_oa_binary(filename):
+    """
+    Recorre los OAs de data/filename. Genera (matriz, cabecera como dict);
+    las matrices no empaquetadas son vistas de solo lectura sobre un único
+    np.memmap del archivo, sin copiar ni parsear nada.
+    """
+    mm = _open(filename)
+    for header, offset in _records(mm):
+        yield _matrix(mm, header, offset), _header_dict(header)
+
+
+def load_oa_binary(filename, index=0):
+    """Devuelve (matriz, cabecera) del registro 'index' de data/filename."""
+    for i, record in enumerate(iter_oa_binary(filename)):
+        if i == index:
+            return record
+    raise IndexError(f"{filename} no tiene registro {index}")
+
+
+def csv_to_binary(csv_name, binary_name, method="", s=None, t=None, pack=False):
+    """Valida un CSV de data/ y lo añade al archivo binario binary_name (s y t como en write_oa_binary)."""
+    return write_oa_binary(load_oa_csv(csv_name), binary_name, method=method or f"csv:{csv_name}", s=s, t=t,
+                           pack=pack)
+
+
+def binary_to_csv(binary_name, csv_name, index=0):
+    """Exporta el registro 'index' de un archivo binario a CSV en data/."""
+    oa, _ = load_oa_binary(binary_name, index)
+    export_oa_to_csv(np.asarray(oa), csv_name)
+
+
+def validate_oa_binary(filename, workers=1):
+    """Valida todos los OAs de un archivo binario de data/ (ver validate_oa)."""
+    for i, (oa, header) in enumerate(iter_oa_binary(filename)):
+        print(f"\n[{filename} #{i}] {header['method'] or 'sin método'} "
+              f"(cabecera: s = {header['s']}, t = {header['t']}, fuerza detectada = {header['strength']}, "
+              f"{header['status']})")
+        validate_oa(np.asarray(oa), workers=workers)
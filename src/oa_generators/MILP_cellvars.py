@@ -3,13 +3,63 @@ from itertools import product, combinations
 import numpy as np
 import time
 
-def generate_oa_cellvars(N, k, s, t, verbose=True, solver='gurobi'):
+from .instrumentation import RunStats
+from .warmstart import prepare_seed, UNKNOWN
+from .deadline import Deadline, set_solver_time_limit, pyomo_status
+from .solver_seed import set_solver_seed
+from .solver_stats import pyomo_solve_stats
+
+# Mayor coeficiente admitido en la ordenación lexicográfica de filas
+LEX_MAX_WEIGHT = 10 ** 6
+
+
+def generate_oa_cellvars(N, k, s, t, verbose=True, solver='gurobi', stats=None, seed=None,
+                         lex_rows=False, symbol_order=False, fix_first_t=False, formulation="standard",
+                         time_limit=None, solver_seed=None):
+    """
+    Genera un OA(N,k,s,t) con variables binarias por celda x[i,j,v].
+    Devuelve (OA_matrix, runtime) o (None, None).
+
+    formulation elige cómo se cuenta cada t-tupla por fila:
+    - "standard": y[i,T,a] binaria, linealización del producto de las x
+      (t cotas superiores y una inferior por variable).
+    - "aggregated": y[i,T,a] continua con t·s igualdades de marginales por
+      (i, T) en lugar de (t+1)·s^t desigualdades; da las mismas matrices.
+      Conserva las N·C(k,t)·s^t variables y: solo reduce filas y no nulos.
+    - "reduced": sin las y de las tuplas que contienen el símbolo s-1. Hay
+      una variable continua z[i,U,a] para cada subconjunto U de 2..t
+      columnas y cada a en {0..s-2}^|U|, es decir
+      N·Σ_r C(k,r)·(s-1)^r en lugar de N·C(k,t)·s^t. Las y eliminadas son
+      combinaciones de z y x por inclusión-exclusión y se exige que no sean
+      negativas; su cobertura la implican la de las z y el equilibrio de
+      columnas.
+
+    time_limit (s) limita la llamada completa, construcción incluida; al
+    agotarse devuelve (None, runtime) con stats.status == "timeout".
+    solver_seed fija la semilla aleatoria del solver (ver solver_seed.py).
+
+    Rupturas de simetría opcionales, activables por separado para medir su
+    efecto (todas las admite la matriz canónica mínima de cada OA, así que
+    pueden combinarse):
+    - lex_rows: filas en orden lexicográfico no decreciente, comparando el
+      valor en base s de las primeras columnas (tantas como quepan con
+      coeficientes <= LEX_MAX_WEIGHT).
+    - symbol_order: en cada columna el símbolo v solo aparece después de
+      que haya aparecido v-1 (orden de primera aparición).
+    - fix_first_t: las primeras t columnas se fijan al bloque canónico de los
+      métodos columna a columna (cada t-tupla λ veces, en orden).
+    """
+    if formulation not in ("standard", "aggregated", "reduced"):
+        raise ValueError(f"Formulación desconocida: {formulation}")
+    deadline = Deadline(time_limit)
+    stats = stats if stats is not None else RunStats()
     λ = N // (s ** t)
     if N != s ** t * λ:
         if verbose:
             print(f"Parámetros inconsistentes: N = {N} ≠ s^t × λ = {s**t * λ}")
         return None, None
 
+    build_start = time.perf_counter()
     model = ConcreteModel()
 
     I = range(N)
@@ -19,69 +69,203 @@ def generate_oa_cellvars(N, k, s, t, verbose=True, solver='gurobi'):
     VAL_COMBOS = list(product(V, repeat=t))
 
     model.x = Var(I, J, V, domain=Binary)
-    model.y = Var(I, COL_COMBOS, VAL_COMBOS, domain=Binary)
 
     model.assign_unique = Constraint(I, J, rule=lambda m, i, j: sum(m.x[i, j, v] for v in V) == 1)
 
-    y_upper_index = [(i, *T, *a, m) for i in I for T in COL_COMBOS for a in VAL_COMBOS for m in range(t)]
+    if formulation == "standard":
+        model.y = Var(I, COL_COMBOS, VAL_COMBOS, domain=Binary)
+        y_upper_index = [(i, *T, *a, m) for i in I for T in COL_COMBOS for a in VAL_COMBOS for m in range(t)]
+
+        def upper_bound_y(model, i, *args):
+            T = args[:t]
+            a = args[t:2*t]
+            m = args[-1]
+            j = T[m]
+            v = a[m]
+            return model.y[i, T, a] <= model.x[i, j, v]
+
+        model.y_upper = Constraint(y_upper_index, rule=upper_bound_y)
+
+        y_lower_index = [(i, *T, a) for i in I for T in COL_COMBOS for a in VAL_COMBOS]
+
+        def lower_bound_y(model, i, *args):
+            T = args[:t]
+            a = args[t:2*t]
+            return model.y[i, T, a] >= sum(model.x[i, T[m], a[m]] for m in range(t)) - (t - 1)
 
-    def upper_bound_y(model, i, *args):
-        T = args[:t]
-        a = args[t:2*t]
-        m = args[-1]
-        j = T[m]
-        v = a[m]
-        return model.y[i, T, a] <= model.x[i, j, v]
+        model.y_lower = Constraint(y_lower_index, rule=lower_bound_y)
+    elif formulation == "reduced":
+        # z[i,U,a] = Π_m x[i,U_m,a_m] para a sin el símbolo s-1 (con |U| = 1
+        # es la propia x y con U vacío, 1). Cualquier otra tupla b de T es
+        # y[i,T,b] = Σ_{S ⊆ P} (-1)^|S| Σ_{c ∈ {0..s-2}^S} z[i, Q∪S, (b_Q, c)],
+        # con P las posiciones de b con s-1 y Q las demás. Con y >= 0 las
+        # y de (i, T) son una distribución con las marginales de x, así que
+        # con x entera z es exactamente el producto.
+        R = range(s - 1)
+        SUBSETS = [U for r in range(2, t + 1) for U in combinations(J, r)]
+        Z_KEYS = [(i, U, a) for i in I for U in SUBSETS for a in product(R, repeat=len(U))]
+        Z_POS = {key: n for n, key in enumerate(Z_KEYS)}
+        model.z = Var(range(len(Z_KEYS)), domain=NonNegativeReals)
 
-    model.y_upper = Constraint(y_upper_index, rule=upper_bound_y)
+        def z_term(i, U, a):
+            if not U:
+                return 1
+            if len(U) == 1:
+                return model.x[i, U[0], a[0]]
+            return model.z[Z_POS[i, U, a]]
 
-    y_lower_index = [(i, *T, a) for i in I for T in COL_COMBOS for a in VAL_COMBOS]
+        def implicit_y(i, T, b):
+            P = [m for m in range(t) if b[m] == s - 1]
+            Q = [m for m in range(t) if b[m] != s - 1]
+            expr = 0
+            for r in range(len(P) + 1):
+                for S in combinations(P, r):
+                    pos = sorted(Q + list(S))
+                    for c in product(R, repeat=r):
+                        vals = {m: b[m] for m in Q}
+                        vals.update(zip(S, c))
+                        expr += (-1) ** r * z_term(i, tuple(T[m] for m in pos), tuple(vals[m] for m in pos))
+            return expr
 
-    def lower_bound_y(model, i, *args):
-        T = args[:t]
-        a = args[t:2*t]
-        return model.y[i, T, a] >= sum(model.x[i, T[m], a[m]] for m in range(t)) - (t - 1)
+        model.y_nonneg = Constraint(
+            [(i, *T, *b) for i in I for T in COL_COMBOS for b in VAL_COMBOS if s - 1 in b],
+            rule=lambda m, i, *args: implicit_y(i, args[:t], args[t:]) >= 0)
+        model.column_balance = Constraint(J, R, rule=lambda m, j, v: sum(m.x[i, j, v] for i in I) == N // s)
+        COVER = [(U, a) for U in SUBSETS for a in product(R, repeat=len(U))]
+        model.coverage = Constraint(
+            range(len(COVER)),
+            rule=lambda m, n: sum(z_term(i, *COVER[n]) for i in I) == N // s ** len(COVER[n][0]))
+    else:
+        # Para cada (i, T), y[i,T,·] es una distribución sobre las s^t tuplas
+        # cuyas marginales son las filas one-hot de x en las columnas de T; con
+        # x entera la única solución es la tupla de la fila, así que y puede
+        # ser continua y sin las cotas de la linealización del producto.
+        model.y = Var(I, COL_COMBOS, VAL_COMBOS, domain=NonNegativeReals)
+        MARGIN = [[[a for a in VAL_COMBOS if a[m] == v] for v in V] for m in range(t)]
 
-    model.y_lower = Constraint(y_lower_index, rule=lower_bound_y)
+        def marginal_rule(model, i, *args):
+            T = args[:t]
+            m, v = args[t:]
+            return sum(model.y[i, T, a] for a in MARGIN[m][v]) == model.x[i, T[m], v]
 
-    coverage_index = [(*T, *a) for T in COL_COMBOS for a in VAL_COMBOS]
+        model.y_marginal = Constraint(
+            [(i, *T, m, v) for i in I for T in COL_COMBOS for m in range(t) for v in V],
+            rule=marginal_rule)
 
-    def coverage_rule(model, *args):
-        T = args[:t]
-        a = args[t:2*t]
-        return sum(model.y[i, T, a] for i in I) == λ
+    if formulation != "reduced":
+        coverage_index = [(*T, *a) for T in COL_COMBOS for a in VAL_COMBOS]
 
-    model.coverage = Constraint(coverage_index, rule=coverage_rule)
+        def coverage_rule(model, *args):
+            T = args[:t]
+            a = args[t:2*t]
+            return sum(model.y[i, T, a] for i in I) == λ
+
+        model.coverage = Constraint(coverage_index, rule=coverage_rule)
 
     model.fix_row_0 = Constraint(J, rule=lambda m, j: m.x[0, j, 0] == 1)
 
     
     FIRST_T_COLS = tuple(range(t))
-    for a in VAL_COMBOS:
-        model.add_component(
-            f"first_t_cov_{a}",
-            Constraint(expr=sum(model.y[i, FIRST_T_COLS, a] for i in I) == λ)
-        )
+    if formulation != "reduced":
+        for a in VAL_COMBOS:
+            model.add_component(
+                f"first_t_cov_{a}",
+                Constraint(expr=sum(model.y[i, FIRST_T_COLS, a] for i in I) == λ)
+            )
+
+    if fix_first_t:
+        block = np.repeat(np.array(VAL_COMBOS), λ, axis=0)
+        for i in I:
+            for j in FIRST_T_COLS:
+                for v in V:
+                    model.x[i, j, v].fix(int(block[i, j] == v))
+
+    if lex_rows:
+        L = 1
+        while L < k and s ** L <= LEX_MAX_WEIGHT:
+            L += 1
+        weights = [s ** (L - 1 - j) for j in range(L)]
+
+        def row_value(m, i):
+            return sum(weights[j] * v * m.x[i, j, v] for j in range(L) for v in V)
+
+        model.lex_rows = Constraint(range(N - 1), rule=lambda m, i: row_value(m, i) <= row_value(m, i + 1))
+
+    if symbol_order:
+        # seen[i,j,v] <= 1 si v ya ha aparecido en la columna j en las filas 0..i
+        model.seen = Var(I, J, V, bounds=(0, 1))
+        model.seen_def = Constraint(
+            I, J, V,
+            rule=lambda m, i, j, v: m.seen[i, j, v] <= m.x[i, j, v] + (m.seen[i - 1, j, v] if i > 0 else 0))
+        model.symbol_order = Constraint(
+            [(i, j, v) for i in I for j in J for v in V if v > 0],
+            rule=lambda m, i, j, v: m.x[i, j, v] <= (m.seen[i - 1, j, v - 1] if i > 0 else 0))
 
 
     model.obj = Objective(expr=0)
 
+    # Warm start: x de las celdas conocidas de la semilla e y (o z) de los
+    # subconjuntos cuyas celdas se conocen todas
+    if seed is not None:
+        seed, _ = prepare_seed(seed, N, k, s)
+        for i in I:
+            for j in J:
+                if seed[i, j] != UNKNOWN:
+                    for v in V:
+                        if not model.x[i, j, v].fixed:
+                            model.x[i, j, v].value = int(seed[i, j] == v)
+            if formulation == "reduced":
+                for U in SUBSETS:
+                    if (seed[i, list(U)] != UNKNOWN).all():
+                        row = tuple(seed[i, list(U)])
+                        for a in product(R, repeat=len(U)):
+                            model.z[Z_POS[i, U, a]].value = int(a == row)
+                continue
+            for T in COL_COMBOS:
+                if (seed[i, list(T)] != UNKNOWN).all():
+                    row = tuple(seed[i, list(T)])
+                    for a in VAL_COMBOS:
+                        model.y[i, T, a].value = int(a == row)
+
+    stats.record("build", time.perf_counter() - build_start)
+
+    solver_name = solver
     solver = SolverFactory(solver)
+    solve_kwargs = {}
+    if seed is not None and getattr(solver, "warm_start_capable", lambda: False)():
+        solve_kwargs["warmstart"] = True
+    if deadline.expired():
+        stats.set_status("timeout")
+        return None, deadline.elapsed()
+    set_solver_time_limit(solver, solver_name, deadline.remaining())
+    set_solver_seed(solver, solver_name, solver_seed)
     try:
         start = time.time()
-        solver.solve(model, tee=verbose)
+        with stats.phase("solve"):
+            results = solver.solve(model, tee=verbose, load_solutions=False, **solve_kwargs)
         runtime = round(time.time() - start, 4)
     except Exception as e:
         if verbose:
             print(f"Error al resolver: {e}")
+        stats.set_status("unknown", type(e).__name__)
         return None, None
 
-    oa_matrix = np.zeros((N, k), dtype=int)
-    for i in I:
-        for j in J:
-            for v in V:
-                if model.x[i, j, v].value > 0.5:
-                    oa_matrix[i, j] = v
-                    break
+    stats.add_solve(pyomo_solve_stats(solver, results))
+    termination = results.solver.termination_condition
+    stats.set_status(pyomo_status(termination), termination)
+    if stats.status != "solved":
+        if verbose:
+            print(f"Sin solución: {termination}")
+        return None, runtime
+    model.solutions.load_from(results)
+
+    with stats.phase("extract"):
+        oa_matrix = np.zeros((N, k), dtype=int)
+        for i in I:
+            for j in J:
+                for v in V:
+                    if model.x[i, j, v].value > 0.5:
+                        oa_matrix[i, j] = v
+                        break
 
     return oa_matrix, runtime
@@ -1,34 +1,30 @@
 import numpy as np
 import pyomo.environ as pyo
-from itertools import combinations, product
+from itertools import product
+from functools import partial
 import time
 
-def select_next_column(fixed, s, t, λ, forbidden=None, solver='gurobi'):
-    """
-    Solve a MILP to construct one new column that extends the fixed array.
-    
-    Parameters:
-    - fixed: np.array (N, p-1), current partial OA.
-    - s: number of symbols.
-    - t: strength.
-    - λ: multiplicity factor (N = λ * s^t).
-    - forbidden: list of previous column vectors to exclude.
-    - solver: MILP solver (default 'gurobi').
+from .instrumentation import RunStats
+from .column_classes import ClassCache
+from .parallel_search import parallel_backtrack, branch_threads, set_solver_threads
+from .deadline import Deadline, set_solver_time_limit, pyomo_status
+from .solver_seed import set_solver_seed
+from .solver_stats import pyomo_solve_stats
 
-    Returns:
-    - newcol: np.array(N,) if feasible, otherwise None.
-    """
-    N, p_minus_1 = fixed.shape
-    if forbidden is None:
-        forbidden = []
+# Pyomo interfaces that keep the model between solves. All but appsi_cbc also
+# keep it loaded in the solver (see ColumnSession)
+PERSISTENT_SOLVERS = {
+    'gurobi': 'gurobi_persistent',
+    'cplex': 'cplex_persistent',
+    'highs': 'appsi_highs',
+    'cbc': 'appsi_cbc',
+}
 
-    subsets = list(combinations(range(p_minus_1), t-1))
-    classes = {}
-    for u_idx, U in enumerate(subsets):
-        block = fixed[:, U]  # (N, t-1)
-        for v_fixed in product(range(s), repeat=t-1):
-            rows = np.where((block == v_fixed).all(axis=1))[0]
-            classes[(u_idx, v_fixed)] = rows
+def _build_column_model(fixed, s, t, λ, forbidden, classes):
+    """
+    Build the Pyomo model for one new column that extends the fixed array.
+    """
+    N = fixed.shape[0]
 
     model = pyo.ConcreteModel()
     model.I = pyo.RangeSet(0, N-1)
@@ -53,7 +49,7 @@ def select_next_column(fixed, s, t, λ, forbidden=None, solver='gurobi'):
     model.symmetry.add(model.x[0, 0] == 1)
 
     model.ortho = pyo.ConstraintList()
-    for (u_idx, v_fixed), rows in classes.items():
+    for U, v_fixed, rows in classes.classes():
         for v_new in range(s):
             model.ortho.add(
                 sum(model.x[i, v_new] for i in rows) == λ
@@ -61,14 +57,16 @@ def select_next_column(fixed, s, t, λ, forbidden=None, solver='gurobi'):
 
     model.forbid = pyo.ConstraintList()
     for fcol in forbidden:
-        model.forbid.add(sum(model.x[i, int(fcol[i])] for i in model.I) <= N - 1)
+        _add_forbid(model, fcol)
 
     model.obj = pyo.Objective(expr=0)
+    return model
 
-    sol = pyo.SolverFactory(solver).solve(model, tee=False)
-    if sol.solver.termination_condition != pyo.TerminationCondition.optimal:
-        return None
+def _add_forbid(model, fcol):
+    """No-good cut: the new column must differ from fcol in at least one row."""
+    return model.forbid.add(sum(model.x[i, int(fcol[i])] for i in model.I) <= len(model.I) - 1)
 
+def _read_column(model, N, s):
     newcol = np.zeros(N, dtype=int)
     for i in range(N):
         for v in range(s):
@@ -76,32 +74,200 @@ def select_next_column(fixed, s, t, λ, forbidden=None, solver='gurobi'):
                 newcol[i] = v
     return newcol
 
-def backtrack_build(fixed, N, k, s, t, λ, solver='gurobi'):
+def _count_unsolved(stats, termination):
+    """
+    Count a subproblem that did not end optimal. Only "infeasible" prunes the
+    branch with a proof; timeouts and any other ending (error, other,
+    maxIterations, ...) are counted so the final status can say "unknown".
+    """
+    status = pyomo_status(termination)
+    if status == "timeout":
+        stats.subproblem_timeouts += 1
+    elif status != "infeasible":
+        stats.subproblem_failures += 1
+
+
+def _solve_failed(stats, error):
+    """A solver call that raised counts as an unproven subproblem."""
+    stats.solver_status = type(error).__name__
+    stats.subproblem_failures += 1
+    print(f"Error al resolver el subproblema: {error}")
+
+
+def select_next_column(fixed, s, t, λ, forbidden=None, solver='gurobi', stats=None, classes=None, deadline=None,
+                       solver_seed=None):
+    """
+    Solve a MILP to construct one new column that extends the fixed array.
+    
+    Parameters:
+    - fixed: np.array (N, p-1), current partial OA.
+    - s: number of symbols.
+    - t: strength.
+    - λ: multiplicity factor (N = λ * s^t).
+    - forbidden: list of previous column vectors to exclude.
+    - solver: MILP solver (default 'gurobi').
+    - stats: optional RunStats where build/solve/extract times are accumulated.
+    - classes: optional ClassCache for fixed, reused across retries and depths.
+    - deadline: optional Deadline; the solver gets the remaining time as its limit.
+    - solver_seed: optional random seed passed to the solver.
+
+    Returns:
+    - newcol: np.array(N,) if feasible, otherwise None.
+    """
+    N, p_minus_1 = fixed.shape
+    if forbidden is None:
+        forbidden = []
+    if stats is None:
+        stats = RunStats()
+
+    build_start = time.perf_counter()
+    if classes is None:
+        classes = ClassCache(fixed, s, t)
+    model = _build_column_model(fixed, s, t, λ, forbidden, classes)
+    stats.record("build", time.perf_counter() - build_start)
+
+    opt = pyo.SolverFactory(solver)
+    if deadline is not None:
+        set_solver_time_limit(opt, solver, deadline.remaining())
+    set_solver_seed(opt, solver, solver_seed)
+    set_solver_threads(opt, solver, branch_threads())
+    try:
+        with stats.phase("solve"):
+            sol = opt.solve(model, tee=False, load_solutions=False)
+    except Exception as e:
+        _solve_failed(stats, e)
+        return None
+    stats.add_solve(pyomo_solve_stats(opt, sol))
+    stats.solver_status = str(sol.solver.termination_condition)
+    if sol.solver.termination_condition != pyo.TerminationCondition.optimal:
+        _count_unsolved(stats, sol.solver.termination_condition)
+        return None
+
+    with stats.phase("extract"):
+        model.solutions.load_from(sol)
+        newcol = _read_column(model, N, s)
+    return newcol
+
+class ColumnSession:
+    """
+    Persistent solver session for one depth of the backtracking.
+
+    The column model is built once; each failed column only adds its no-good
+    cut to the live model instead of rebuilding it. With the Pyomo persistent
+    interfaces (gurobi_persistent, cplex_persistent) and appsi_highs the model
+    also stays loaded in the solver, which re-solves warm. appsi_cbc only
+    saves the Pyomo rebuild: it rewrites the LP file and starts a new cbc
+    process, cold, on every solve.
+    """
+
+    def __init__(self, fixed, s, t, λ, solver='gurobi', stats=None, classes=None, deadline=None,
+                 solver_seed=None):
+        self.N = fixed.shape[0]
+        self.deadline = deadline
+        self.s = s
+        self.stats = stats if stats is not None else RunStats()
+
+        build_start = time.perf_counter()
+        if classes is None:
+            classes = ClassCache(fixed, s, t)
+        self.model = _build_column_model(fixed, s, t, λ, [], classes)
+        self.solver = PERSISTENT_SOLVERS.get(solver, solver)
+        self.opt = pyo.SolverFactory(self.solver)
+        set_solver_seed(self.opt, self.solver, solver_seed)
+        set_solver_threads(self.opt, self.solver, branch_threads())
+        # Pyomo persistent interfaces need constraints added explicitly
+        self.explicit_updates = hasattr(self.opt, 'add_constraint')
+        if hasattr(self.opt, 'set_instance'):
+            self.opt.set_instance(self.model)
+        self.stats.record("build", time.perf_counter() - build_start)
+        self.solved_once = False
+
+    def forbid(self, fcol):
+        with self.stats.phase("build"):
+            con = _add_forbid(self.model, fcol)
+            if self.explicit_updates:
+                self.opt.add_constraint(con)
+
+    def next_column(self):
+        kwargs = {'load_solutions': False}
+        if self.explicit_updates and self.solved_once:
+            kwargs['warmstart'] = True
+        if self.deadline is not None:
+            set_solver_time_limit(self.opt, self.solver, self.deadline.remaining())
+        try:
+            with self.stats.phase("solve"):
+                results = self.opt.solve(self.model, tee=False, **kwargs)
+        except Exception as e:
+            _solve_failed(self.stats, e)
+            return None
+        self.stats.add_solve(pyomo_solve_stats(self.opt, results))
+        self.solved_once = True
+        self.stats.solver_status = str(results.solver.termination_condition)
+        if results.solver.termination_condition != pyo.TerminationCondition.optimal:
+            _count_unsolved(self.stats, results.solver.termination_condition)
+            return None
+        with self.stats.phase("extract"):
+            if self.explicit_updates:
+                self.opt.load_vars()
+            else:
+                self.model.solutions.load_from(results)
+            return _read_column(self.model, self.N, self.s)
+
+def backtrack_build(fixed, N, k, s, t, λ, solver='gurobi', stats=None, classes=None, persistent=False,
+                    stop=None, deadline=None, solver_seed=None):
     """
     Recursively attempts to extend a partially built OA to k columns.
     Returns the complete OA if successful, or None if failed.
+    The ClassCache in classes is extended on each push and restored on backtrack.
+    With persistent=True each depth keeps one ColumnSession alive across retries.
+    stop is an optional shared event; once set, the search gives up (None).
+    deadline is an optional Deadline shared by every subproblem; once it
+    expires the search gives up as well. solver_seed is passed to every solve.
     """
     p = fixed.shape[1]
+    if stats is not None:
+        stats.add_partial(fixed)
     if p == k:
         return fixed
+    if classes is None:
+        classes = ClassCache(fixed, s, t)
 
     print(f"Intentando extender con nuevas columnas... (fijas: {p}, objetivo: {k})")
     print("Fijas (filas):", [list(map(int, row)) for row in fixed])
 
     forbidden = []
+    session = None
     while True:
-        newcol = select_next_column(fixed, s, t, λ, forbidden, solver)
+        if (stop is not None and stop.is_set()) or (deadline is not None and deadline.expired()):
+            return None
+        col_start = time.perf_counter()
+        if persistent:
+            if session is None:
+                session = ColumnSession(fixed, s, t, λ, solver, stats, classes, deadline, solver_seed)
+            newcol = session.next_column()
+        else:
+            newcol = select_next_column(fixed, s, t, λ, forbidden, solver, stats, classes, deadline, solver_seed)
+        if stats is not None:
+            stats.add_column_time(p, time.perf_counter() - col_start)
         if newcol is None:
             return None
 
         candidate = np.hstack((fixed, newcol.reshape(-1,1)))
-        result = backtrack_build(candidate, N, k, s, t, λ, solver)
+        classes.push(newcol)
+        result = backtrack_build(candidate, N, k, s, t, λ, solver, stats, classes, persistent, stop, deadline,
+                                 solver_seed)
         if result is not None:
             return result
+        classes.pop()
         print("Columna fallida:", list(map(int, newcol)))
         forbidden.append(newcol)
+        if stats is not None:
+            stats.backtracks += 1
+        if session is not None:
+            session.forbid(newcol)
 
-def generate_oa_with_backtracking(N, k, s, t, solver='gurobi'):
+def generate_oa_with_backtracking(N, k, s, t, solver='gurobi', stats=None, persistent=False, workers=1,
+                                  time_limit=None, solver_seed=None):
     """
     Entrypoint for generating a complete OA using the column-by-column method.
     
@@ -111,10 +277,26 @@ def generate_oa_with_backtracking(N, k, s, t, solver='gurobi'):
     - s: number of symbols.
     - t: strength.
     - solver: MILP solver to use.
+    - stats: optional RunStats; phase times are summed over every subproblem
+      and per-column times are keyed by the column index being built.
+    - persistent: keep one persistent solver session per depth and add the
+      no-good cuts incrementally instead of rebuilding the model per retry.
+    - workers: with workers != 1, candidate columns for the first free column
+      are explored concurrently in that many processes (None: every available
+      core), see parallel_search.parallel_backtrack.
+    - time_limit: wall-clock budget (s) for the whole call, shared by every
+      subproblem. On timeout returns (None, runtime) with stats.status set
+      to "timeout" and the widest partial array reached in stats.partial.
+      If the search is exhausted it returns (None, runtime) with
+      stats.status "infeasible" only if every pruned subproblem was proven
+      infeasible ("unknown" if some timed out or failed otherwise).
+    - solver_seed: random seed for every subproblem solve, so repeated
+      benchmark runs are reproducible.
 
     Returns:
-    - OA as a NumPy array.
+    - (OA as a NumPy array, runtime), or (None, runtime) if none was found.
     """
+    deadline = Deadline(time_limit)
     λ = N // (s ** t)
     if N != λ * (s ** t):
         raise ValueError("Parámetros incoherentes: N ≠ λ·s^t")
@@ -122,10 +304,32 @@ def generate_oa_with_backtracking(N, k, s, t, solver='gurobi'):
     base = np.array(list(product(range(s), repeat=t)))
     fixed = np.repeat(base, λ, axis=0)
 
+    if stats is None:
+        stats = RunStats()
+
     start = time.time()
-    OA = backtrack_build(fixed, N, k, s, t, λ, solver)
+    if workers == 1 or t >= k:
+        OA = backtrack_build(fixed, N, k, s, t, λ, solver, stats, persistent=persistent, deadline=deadline,
+                             solver_seed=solver_seed)
+    else:
+        classes = ClassCache(fixed, s, t)
+        stats.add_partial(fixed)
+        OA = parallel_backtrack(
+            fixed,
+            lambda forbidden: select_next_column(fixed, s, t, λ, forbidden, solver, stats, classes, deadline,
+                                                 solver_seed),
+            partial(backtrack_build, N=N, k=k, s=s, t=t, λ=λ, solver=solver, persistent=persistent,
+                    deadline=deadline, solver_seed=solver_seed),
+            workers, stats, deadline)
     runtime = time.time() - start
 
     if OA is None:
-        raise RuntimeError("No se encontró OA factible aunque con backtracking.")
+        if deadline.expired():
+            stats.set_status("timeout")
+            return None, round(runtime, 4)
+        # Search exhausted: a proof only if every pruned subproblem was proven infeasible
+        proven = stats.subproblem_timeouts == 0 and stats.subproblem_failures == 0
+        stats.set_status("infeasible" if proven else "unknown")
+        return None, round(runtime, 4)
+    stats.set_status("solved")
     return OA, round(runtime, 4)
@@ -1,102 +1,218 @@
 from pyomo.environ import *
 from itertools import product, combinations
-import numpy as np
 import time
 
-def generate_oa_row_selection(N, k, s, t, verbose=True, solver='gurobi'):
+from . import row_universe
+from .row_universe import RowUniverse, projection_index
+from .instrumentation import RunStats
+from .warmstart import prepare_seed, seed_candidates, UNKNOWN
+from .deadline import Deadline, set_solver_time_limit, pyomo_status
+from .solver_seed import set_solver_seed
+from .solver_stats import pyomo_solve_stats
+from .model_cache import ModelCache, FILE_SOLVERS, model_key, solve_model_file, indexed_values
+
+
+def _solve_from_cache(N, k, s, t, solver, UNIVERSE, build_model, deadline, stats, verbose, solver_seed):
+    """
+    Resuelve el modelo de selección de filas desde la caché en disco: se
+    construye y se escribe en MPS solo la primera vez y el solver lee el
+    archivo directamente (ver model_cache.ModelCache).
+    """
+    key = model_key("row_selection", [__file__, row_universe.__file__], N=N, k=k, s=s, t=t)
+    path = ModelCache().get_or_write(key, build_model, stats, params={"N": N, "k": k, "s": s, "t": t})
+    if deadline.expired():
+        stats.set_status("timeout")
+        return None, deadline.elapsed()
+    start = time.time()
+    try:
+        status, solver_status, values = solve_model_file(path, solver, stats, deadline.remaining(), solver_seed)
+    except Exception as e:
+        if verbose:
+            print(f"Error al resolver: {e}")
+        stats.set_status("unknown", type(e).__name__)
+        return None, None
+    runtime = round(time.time() - start, 4)
+    stats.set_status(status, solver_status)
+    if status != "solved":
+        if verbose:
+            print(f"Sin solución: {solver_status}")
+        return None, runtime
+
+    with stats.phase("extract"):
+        x = indexed_values(values, "x")
+        selected_rows = sorted(i for i, value in x.items() if value > 0.5)
+        oa_matrix = UNIVERSE.decode(selected_rows).astype(int)
+    if len(selected_rows) != N:
+        if verbose:
+            print("No se seleccionó el número correcto de filas.")
+        stats.set_status("unknown")
+        return None, None
+    return oa_matrix, runtime
+
+
+def generate_oa_row_selection(N, k, s, t, verbose=True, solver='gurobi', stats=None, seed=None,
+                              time_limit=None, solver_seed=None, cache=False):
     """
     Genera un Orthogonal Array usando Pyomo + Gurobi.
     Devuelve (OA_matrix, runtime_en_segundos) o (None, None) si no hay solución.
+    Si se pasa un RunStats en stats, registra ahí el tiempo de cada fase.
+    seed es una matriz opcional (completa o parcial, ver warmstart.prepare_seed)
+    que se pasa al solver como solución inicial.
+    time_limit (s) limita la llamada completa, construcción incluida; al
+    agotarse devuelve (None, runtime) con stats.status == "timeout".
+    solver_seed fija la semilla aleatoria del solver (ver solver_seed.py).
+    Con cache=True (y sin seed) el modelo se guarda en MPS la primera vez y
+    después se resuelve leyendo el archivo, sin construirlo en Python; solo
+    para los solvers de model_cache.FILE_SOLVERS, el resto lo ignoran.
     """
+    deadline = Deadline(time_limit)
+    stats = stats if stats is not None else RunStats()
     λ = N // (s ** t)
     if N != s ** t * λ:
         if verbose:
             print("Parámetros inconsistentes: N debe ser igual a s^t * λ.")
         return None, None
 
-    # Generate all possible rows: s^k total
-    ALL_ROWS = list(product(range(s), repeat=k))
-
-    ROW_IDX = range(len(ALL_ROWS))
-
-    # All t-subsets of columns
-    COL_COMBOS = list(combinations(range(k), t))
-    TUPLES = list(product(range(s), repeat=t))  # all t-tuples of symbols
-
-    model = ConcreteModel()
-
-    # Row decision variables
-    model.x = Var(ROW_IDX, domain=Binary)
-
-    # Constraint: for each t-combo of columns and each value tuple, λ appearances
-    def orthogonality_rule(model, *args):
-        cj = args[:t]
-        vj = args[t:]
-
-        matching_rows = [
-            i for i, row in enumerate(ALL_ROWS)
-            if tuple(row[j] for j in cj) == vj
-        ]
-        # Assert valid model (this should never trigger in full universe)
-        if not matching_rows:
-            raise ValueError(f"No rows match tuple {vj} in columns {cj} — model likely broken")
-        
-        return sum(model.x[i] for i in matching_rows) == λ
-
-    model.orthogonality = Constraint(
-        [(*cj, *vj) for cj in COL_COMBOS for vj in TUPLES],
-        rule=orthogonality_rule
-    )
-
-    # Fix one row to break symmetry (e.g., first row always selected)
-    model.fix_first = Constraint(expr=model.x[0] == 1)
-
-    # Total number of selected rows must be N
-    model.total_rows = Constraint(expr=sum(model.x[i] for i in ROW_IDX) == N)
-
-    # --- New: Fix the first t columns with all possible t-tuples exactly once ---
-
-    # For each t-tuple, find all rows where the first t columns equal that tuple
-    first_t_tuple_rows = {
-        v: [i for i, row in enumerate(ALL_ROWS) if tuple(row[:t]) == v]
-        for v in TUPLES
-    }
-
-    # Constraint: each t-tuple appears exactly once in the first t columns
-    def first_t_columns_rule(model, *v):
-        return sum(model.x[i] for i in first_t_tuple_rows[v]) == λ
-
-    model.first_t_columns_fixed = Constraint(TUPLES, rule=first_t_columns_rule)
-
-    
-
-    # Feasibility objective
-    model.obj = Objective(expr=0)
+    build_start = time.perf_counter()
+
+    # Implicit universe of all s^k possible rows (decoded on demand)
+    UNIVERSE = RowUniverse(s, k)
+
+    ROW_IDX = range(len(UNIVERSE))
+
+    def build_model():
+        # All t-subsets of columns
+        COL_COMBOS = list(combinations(range(k), t))
+        TUPLES = list(product(range(s), repeat=t))  # all t-tuples of symbols
+
+        # Index (column combo, tuple) -> matching rows, built in one pass per combo
+        INDEX = projection_index(s, k, t, COL_COMBOS, UNIVERSE)
+
+        model = ConcreteModel()
+
+        # Row decision variables
+        model.x = Var(ROW_IDX, domain=Binary)
+
+        # Constraint: for each t-combo of columns and each value tuple, λ appearances
+        def orthogonality_rule(model, *args):
+            cj = args[:t]
+            vj = args[t:]
+
+            matching_rows = INDEX[(tuple(cj), tuple(vj))]
+            # Assert valid model (this should never trigger in full universe)
+            if len(matching_rows) == 0:
+                raise ValueError(f"No rows match tuple {vj} in columns {cj} — model likely broken")
+
+            return sum(model.x[i] for i in matching_rows) == λ
+
+        model.orthogonality = Constraint(
+            [(*cj, *vj) for cj in COL_COMBOS for vj in TUPLES],
+            rule=orthogonality_rule
+        )
+
+        # Fix one row to break symmetry (e.g., first row always selected)
+        model.fix_first = Constraint(expr=model.x[0] == 1)
+
+        # Total number of selected rows must be N
+        model.total_rows = Constraint(expr=sum(model.x[i] for i in ROW_IDX) == N)
+
+        # --- New: Fix the first t columns with all possible t-tuples exactly once ---
+
+        # For each t-tuple, find all rows where the first t columns equal that tuple
+        first_t_tuple_rows = {v: INDEX[(tuple(range(t)), v)] for v in TUPLES}
+
+        # Constraint: each t-tuple appears exactly once in the first t columns
+        def first_t_columns_rule(model, *v):
+            return sum(model.x[i] for i in first_t_tuple_rows[v]) == λ
+
+        model.first_t_columns_fixed = Constraint(TUPLES, rule=first_t_columns_rule)
+
+        # Feasibility objective
+        model.obj = Objective(expr=0)
+        return model
+
+    if cache and seed is None and solver in FILE_SOLVERS:
+        return _solve_from_cache(N, k, s, t, solver, UNIVERSE, build_model, deadline, stats, verbose,
+                                 solver_seed)
+
+    model = build_model()
+
+    # Warm start: se marcan las filas completas de la semilla. Solo si la
+    # semilla es una OA sin filas repetidas es una solución del modelo y se
+    # ponen a 0 las demás. Si es parcial (p. ej. un diseño con una columna
+    # menos) se ponen a 0 las filas que no coinciden con ninguna de la
+    # semilla en sus celdas conocidas: el solver solo tiene que elegir entre
+    # las que la extienden.
+    if seed is not None:
+        seed, complete = prepare_seed(seed, N, k, s)
+        known = seed[(seed != UNKNOWN).all(axis=1)]
+        seeded = set(UNIVERSE.encode(known).tolist())
+        if complete and len(seeded) == N:
+            for i in ROW_IDX:
+                model.x[i].value = 0
+        elif not complete:
+            candidates = seed_candidates(seed, UNIVERSE)
+            if candidates is not None:
+                candidates = set(candidates.tolist())
+                for i in ROW_IDX:
+                    if i not in candidates:
+                        model.x[i].value = 0
+            if verbose:
+                print(f"Warm start parcial: {len(seeded)} filas completas, "
+                      f"{'todas' if candidates is None else len(candidates)} filas candidatas")
+        for i in seeded:
+            model.x[i].value = 1
+
+    stats.record("build", time.perf_counter() - build_start)
+    build_time = round(stats.phases["build"], 4)
+    if verbose:
+        print(f"Tiempo de construcción del modelo: {build_time} segundos")
 
 
     # Solver configuration
+    solver_name = solver
     solver = SolverFactory(solver)
+    solve_kwargs = {}
+    if seed is not None and getattr(solver, "warm_start_capable", lambda: False)():
+        solve_kwargs["warmstart"] = True
+    if deadline.expired():
+        stats.set_status("timeout")
+        return None, deadline.elapsed()
+    set_solver_time_limit(solver, solver_name, deadline.remaining())
+    set_solver_seed(solver, solver_name, solver_seed)
     try:
         start = time.time()
-        results = solver.solve(model, tee=verbose, load_solutions=True)
-        model.solutions.load_from(results)
+        with stats.phase("solve"):
+            results = solver.solve(model, tee=verbose, load_solutions=False, **solve_kwargs)
         end = time.time()
         runtime = round(end - start, 4)
     except Exception as e:
         if verbose:
             print(f"Error al resolver: {e}")
+        stats.set_status("unknown", type(e).__name__)
         return None, None
 
+    stats.add_solve(pyomo_solve_stats(solver, results))
+    termination = results.solver.termination_condition
+    stats.set_status(pyomo_status(termination), termination)
+    if stats.status != "solved":
+        if verbose:
+            print(f"Sin solución: {termination}")
+        return None, runtime
+    model.solutions.load_from(results)
+
     # Extraer solución
-    selected_rows = [i for i in ROW_IDX if model.x[i].value > 0.5]
+    with stats.phase("extract"):
+        selected_rows = [i for i in ROW_IDX if model.x[i].value > 0.5]
+        oa_matrix = UNIVERSE.decode(selected_rows).astype(int)
     if verbose:
         print(f"Filas seleccionadas: {len(selected_rows)}")
-        print(f"Tiempo de ejecución: {runtime} segundos")
+        print(f"Tiempo de resolución: {runtime} segundos (construcción: {build_time} s)")
     if len(selected_rows) != N:
         if verbose:
             print("No se seleccionó el número correcto de filas.")
+        stats.set_status("unknown")
         return None, None
 
-    oa_matrix = np.array([ALL_ROWS[i] for i in selected_rows])
     return oa_matrix, runtime
 
@@ -1,10 +1,21 @@
 import numpy as np
 import time
 from ortools.sat.python import cp_model
-from itertools import combinations, product
+from itertools import product
+from functools import partial
 
+from .instrumentation import RunStats
+from .column_classes import ClassCache
+from .parallel_search import parallel_backtrack, branch_threads
+from .deadline import Deadline
+from .solver_stats import cpsat_solve_stats, capture_cpsat_log
 
-def select_next_column_cp(fixed, s, t, λ, forbidden=None, timeout=30):
+
+def select_next_column_cp(fixed, s, t, λ, forbidden=None, timeout=30, stats=None, classes=None, deadline=None,
+                          solver_seed=None):
+    if stats is None:
+        stats = RunStats()
+    build_start = time.perf_counter()
     model = cp_model.CpModel()
     N = fixed.shape[0]
     p = fixed.shape[1]
@@ -23,13 +34,13 @@ def select_next_column_cp(fixed, s, t, λ, forbidden=None, timeout=30):
         model.Add(sum(b[i, v] for i in range(N)) == N // s)
 
     # Ortogonalidad: cada combinación (t-1 fijas + nueva columna) aparece λ veces
-    for idxs in combinations(range(p), t - 1):
-        for prefix in product(range(s), repeat=t - 1):
-            rows = [i for i in range(N) if tuple(fixed[i, list(idxs)]) == prefix]
-            if not rows:
-                continue
-            for v in range(s):
-                model.Add(sum(b[i, v] for i in rows) == λ)
+    if classes is None:
+        classes = ClassCache(fixed, s, t)
+    for idxs, prefix, rows in classes.classes():
+        if len(rows) == 0:
+            continue
+        for v in range(s):
+            model.Add(sum(b[i, v] for i in rows) == λ)
 
     # Simmetry breaking
     model.Add(col[0] == 0)
@@ -47,36 +58,75 @@ def select_next_column_cp(fixed, s, t, λ, forbidden=None, timeout=30):
                               cp_model.CHOOSE_FIRST,
                               cp_model.SELECT_MIN_VALUE)
 
+    stats.record("build", time.perf_counter() - build_start)
+
     # Solver
     solver = cp_model.CpSolver()
-    solver.parameters.max_time_in_seconds = timeout
-    solver.parameters.num_search_workers = 8  # Ajustar según CPU
-
-    status = solver.Solve(model)
+    # Límite por columna, recortado al tiempo que quede del plazo global
+    solver.parameters.max_time_in_seconds = deadline.cap(timeout) if deadline is not None else timeout
+    # 8 hilos, o los que toquen a cada proceso en la búsqueda en paralelo
+    solver.parameters.num_search_workers = branch_threads() or 8
+    if solver_seed is not None:
+        solver.parameters.random_seed = solver_seed
+
+    log = capture_cpsat_log(solver)
+    with stats.phase("solve"):
+        status = solver.Solve(model)
+    stats.add_solve(cpsat_solve_stats(model, solver, log))
+    stats.solver_status = solver.StatusName(status)
     if status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
-        return np.array([solver.Value(c) for c in col])
+        with stats.phase("extract"):
+            return np.array([solver.Value(c) for c in col])
+    if status == cp_model.UNKNOWN:
+        stats.subproblem_timeouts += 1
     return None
 
 
-def backtrack_build(fixed, N, k, s, t, λ):
+def backtrack_build(fixed, N, k, s, t, λ, stats=None, classes=None, stop=None, deadline=None, solver_seed=None):
     p = fixed.shape[1]
+    if stats is not None:
+        stats.add_partial(fixed)
     if p == k:
         return fixed
+    if classes is None:
+        classes = ClassCache(fixed, s, t)
     print(f"Extendiendo con columnas... ({p} -> {k})")
     forbidden = []
     while True:
-        newcol = select_next_column_cp(fixed, s, t, λ, forbidden)
+        if (stop is not None and stop.is_set()) or (deadline is not None and deadline.expired()):
+            return None
+        col_start = time.perf_counter()
+        newcol = select_next_column_cp(fixed, s, t, λ, forbidden, stats=stats, classes=classes, deadline=deadline,
+                                       solver_seed=solver_seed)
+        if stats is not None:
+            stats.add_column_time(p, time.perf_counter() - col_start)
         if newcol is None:
             return None
         candidate = np.hstack((fixed, newcol.reshape(-1, 1)))
-        result = backtrack_build(candidate, N, k, s, t, λ)
+        classes.push(newcol)
+        result = backtrack_build(candidate, N, k, s, t, λ, stats, classes, stop, deadline, solver_seed)
         if result is not None:
             return result
+        classes.pop()
         forbidden.append(newcol)
+        if stats is not None:
+            stats.backtracks += 1
         print(f"Columna fallida (añadida a forb): {newcol}")
 
 
-def generate_oa_with_backtracking_ORT(N, k, s, t):
+def generate_oa_with_backtracking_ORT(N, k, s, t, stats=None, workers=1, time_limit=None, solver_seed=None):
+    """
+    Genera un OA(N,k,s,t) columna a columna con CP-SAT y backtracking.
+    Con workers != 1 las candidatas de la primera columna libre se exploran
+    en paralelo en ese número de procesos (None: todos los núcleos), ver
+    parallel_search.parallel_backtrack.
+    time_limit (s) es el plazo de toda la llamada: cada columna usa como
+    límite lo que quede (como mucho 30 s). Al agotarse devuelve
+    (None, runtime) con stats.status == "timeout" y la OA parcial más ancha
+    en stats.partial. Si se agota la búsqueda devuelve (None, runtime) con
+    stats.status == "unknown". solver_seed fija el random_seed de CP-SAT.
+    """
+    deadline = Deadline(time_limit)
     λ = N // (s ** t)
     if N != λ * (s ** t):
         raise ValueError("N debe ser múltiplo de s^t (N = λ·s^t)")
@@ -84,12 +134,33 @@ def generate_oa_with_backtracking_ORT(N, k, s, t):
     base = np.array(list(product(range(s), repeat=t)))
     fixed = np.repeat(base, λ, axis=0)
 
+    if stats is None:
+        stats = RunStats()
+
     start = time.time()
-    OA = backtrack_build(fixed, N, k, s, t, λ)
+    if workers == 1 or t >= k:
+        OA = backtrack_build(fixed, N, k, s, t, λ, stats, deadline=deadline, solver_seed=solver_seed)
+    else:
+        classes = ClassCache(fixed, s, t)
+        stats.add_partial(fixed)
+        OA = parallel_backtrack(
+            fixed,
+            lambda forbidden: select_next_column_cp(fixed, s, t, λ, forbidden, stats=stats, classes=classes,
+                                                    deadline=deadline, solver_seed=solver_seed),
+            partial(backtrack_build, N=N, k=k, s=s, t=t, λ=λ, deadline=deadline, solver_seed=solver_seed),
+            workers, stats, deadline)
     runtime = round(time.time() - start, 4)
 
     if OA is None:
-        raise RuntimeError("No se encontró OA factible.")
+        if deadline.expired():
+            stats.set_status("timeout")
+            return None, runtime
+        # La ruptura de simetría col[i] == i no es válida en general: agotar
+        # la búsqueda no prueba que no exista
+        stats.set_status("unknown")
+        print("No se encontró OA factible.")
+        return None, runtime
+    stats.set_status("solved")
     return OA, runtime
 
 
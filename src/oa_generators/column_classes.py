@@ -0,0 +1,69 @@
+import numpy as np
+from itertools import product
+
+
+class ClassCache:
+    """
+    Clases de ortogonalidad de una OA parcial para los métodos columna a columna.
+
+    Para cada (t-1)-subconjunto U de columnas fijas y cada (t-1)-tupla v, la
+    clase es el conjunto de filas i con fixed[i, U] == v; la nueva columna debe
+    tomar cada símbolo exactamente λ veces dentro de cada clase.
+
+    Se guardan los códigos en base s (por fila) de todos los subconjuntos de
+    tamaño menor que t. Al añadir una columna (push) solo se calculan los
+    subconjuntos que la contienen, a partir de los ya existentes, y al hacer
+    backtracking (pop) se descartan. Las clases de cada subconjunto se agrupan
+    una sola vez y se reutilizan en todos los reintentos de la misma
+    profundidad.
+    """
+
+    def __init__(self, fixed, s, t):
+        self.s = s
+        self.t = t
+        self.N = fixed.shape[0]
+        self.p = 0
+        # _levels[m] = lista de (U, códigos) para los subconjuntos de tamaño m
+        self._levels = [[((), np.zeros(self.N, dtype=np.int64))]] + [[] for _ in range(t - 1)]
+        self._pushes = []
+        self._groups = {}
+        self._tuples = list(product(range(s), repeat=t - 1))
+        for col in np.asarray(fixed).T:
+            self.push(col)
+
+    def push(self, col):
+        """Añade la columna col (vector de N símbolos) como columna p."""
+        j = self.p
+        col = np.asarray(col, dtype=np.int64)
+        added = []
+        # De mayor a menor tamaño, para extender solo subconjuntos sin la columna j
+        for m in range(self.t - 1, 0, -1):
+            new = [(U + (j,), codes * self.s + col) for U, codes in self._levels[m - 1]]
+            self._levels[m].extend(new)
+            added.append((m, len(new)))
+        self._pushes.append(added)
+        self.p += 1
+
+    def pop(self):
+        """Deshace el último push."""
+        for m, count in self._pushes.pop():
+            if count:
+                for U, _ in self._levels[m][-count:]:
+                    self._groups.pop(U, None)
+                del self._levels[m][-count:]
+        self.p -= 1
+
+    def _rows_by_tuple(self, U, codes):
+        groups = self._groups.get(U)
+        if groups is None:
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(self._tuples) + 1))
+            groups = [order[bounds[c]:bounds[c + 1]] for c in range(len(self._tuples))]
+            self._groups[U] = groups
+        return groups
+
+    def classes(self):
+        """Genera (U, v_fixed, filas) para cada (t-1)-subconjunto U y cada (t-1)-tupla."""
+        for U, codes in self._levels[self.t - 1]:
+            for v_fixed, rows in zip(self._tuples, self._rows_by_tuple(U, codes)):
+                yield U, v_fixed, rows
@@ -0,0 +1,178 @@
+import time
+from functools import lru_cache
+from itertools import product
+
+import numpy as np
+
+from .instrumentation import RunStats
+
+
+def prime_power(q):
+    """Devuelve (p, m) si q = p^m con p primo, o None."""
+    if q < 2:
+        return None
+    p = next(d for d in range(2, q + 1) if q % d == 0)
+    m = 0
+    while q % p == 0:
+        q //= p
+        m += 1
+    return (p, m) if q == 1 else None
+
+
+class GF:
+    """
+    Cuerpo finito GF(q), q = p^m, con tablas de suma y producto.
+
+    Los elementos son los enteros 0..q-1, cuyos dígitos en base p son los
+    coeficientes del polinomio que representan (módulo un polinomio mónico
+    irreducible de grado m, buscado por fuerza bruta). 0 y 1 son el neutro de
+    la suma y del producto.
+    """
+
+    def __init__(self, q):
+        pm = prime_power(q)
+        if pm is None:
+            raise ValueError(f"{q} no es potencia de primo")
+        self.q = q
+        self.p, self.m = pm
+        self._digits = np.array([[(e // self.p ** i) % self.p for i in range(self.m)]
+                                 for e in range(q)])
+        self.add = self._digits_to_int((self._digits[:, None, :] + self._digits[None, :, :]) % self.p)
+        self.mul = self._find_mul_table()
+
+    def _digits_to_int(self, digits):
+        return (digits * self.p ** np.arange(self.m)).sum(axis=-1)
+
+    def _mul_table(self, modulus):
+        p, m = self.p, self.m
+        digits = self._digits
+        table = np.zeros((self.q, self.q), dtype=int)
+        for a in range(self.q):
+            for b in range(a, self.q):
+                prod = np.convolve(digits[a], digits[b]) % p
+                # Reducción módulo x^m + modulus(x)
+                for deg in range(len(prod) - 1, m - 1, -1):
+                    c = prod[deg]
+                    if c:
+                        prod[deg - m:deg] = (prod[deg - m:deg] - c * modulus) % p
+                        prod[deg] = 0
+                table[a, b] = table[b, a] = self._digits_to_int(prod[:m])
+        return table
+
+    def _find_mul_table(self):
+        if self.m == 1:
+            return np.outer(np.arange(self.q), np.arange(self.q)) % self.p
+        nonzero = set(range(1, self.q))
+        for coeffs in product(range(self.p), repeat=self.m):
+            if coeffs[0] == 0:
+                continue
+            table = self._mul_table(np.array(coeffs))
+            # El cociente es un cuerpo si cada fila no nula permuta los no nulos
+            if all(set(table[a, 1:]) == nonzero for a in range(1, self.q)):
+                return table
+        raise RuntimeError(f"No se encontró polinomio irreducible para GF({self.q})")
+
+    def power(self, x, e):
+        result = 1
+        for _ in range(e):
+            result = self.mul[result, x]
+        return result
+
+    def dot(self, X, C):
+        """Producto escalar en GF(q) de cada fila de X (n×d) con cada fila de C (k×d): matriz n×k."""
+        acc = np.zeros((X.shape[0], C.shape[0]), dtype=int)
+        for i in range(X.shape[1]):
+            acc = self.add[acc, self.mul[X[:, i][:, None], C[None, :, i]]]
+        return acc
+
+
+def _all_vectors(q, d):
+    return np.array(list(product(range(q), repeat=d)), dtype=int).reshape(-1, d)
+
+
+def rao_hamming(q, m, k):
+    """
+    OA(q^m, k, q, 2) de Rao–Hamming, k <= (q^m - 1)/(q - 1): filas = vectores
+    x de GF(q)^m, columnas = puntos c del espacio proyectivo (primera
+    coordenada no nula igual a 1), entrada x·c.
+    """
+    field = GF(q)
+    points = []
+    for lead in range(m - 1, -1, -1):
+        for tail in product(range(q), repeat=lead):
+            points.append((0,) * (m - 1 - lead) + (1,) + tail)
+            if len(points) == k:
+                return field.dot(_all_vectors(q, m), np.array(points))
+    raise ValueError(f"Rao–Hamming OA({q**m},·,{q},2) tiene como mucho {len(points)} columnas")
+
+
+def bush(q, t, k):
+    """
+    OA(q^t, k, q, t) de Bush, t <= q y k <= q + 1: filas = polinomios f de
+    grado < t sobre GF(q), columnas = f(x) para cada x de GF(q) más el
+    coeficiente de grado t-1 (punto del infinito). Si q es par y t = 3 se
+    admite k = q + 2 añadiendo el coeficiente de grado 1 (hiperóvalo).
+    """
+    k_max = q + 2 if t == 3 and q % 2 == 0 else q + 1
+    if t > q or k > k_max:
+        raise ValueError(f"Bush no da OA({q**t},{k},{q},{t})")
+    field = GF(q)
+    points = [[field.power(x, e) for e in range(t)] for x in range(q)]
+    points.append([0] * (t - 1) + [1])
+    if t == 3:
+        points.append([0, 1, 0])
+    return field.dot(_all_vectors(q, t), np.array(points[:k]))
+
+
+def construct_oa(N, k, s, t):
+    """
+    Construye una OA(N,k,s,t) algebraicamente si hay construcción conocida:
+    s potencia de primo y N = λ·s^t. Para t = 2 usa Rao–Hamming con el menor
+    m que da k columnas (q^(m-2) debe dividir a λ); para t >= 3, Bush. El
+    resto de λ se obtiene yuxtaponiendo (apilando) copias. Devuelve None si
+    no se aplica ninguna.
+    """
+    if t < 2 or prime_power(s) is None or N % s ** t:
+        return None
+    λ = N // s ** t
+    base = None
+    if t == 2:
+        m = 2
+        while λ % s ** (m - 2) == 0:
+            if k <= (s ** m - 1) // (s - 1):
+                base = rao_hamming(s, m, k)
+                break
+            m += 1
+    else:
+        try:
+            base = bush(s, t, k)
+        except ValueError:
+            return None
+    if base is None:
+        return None
+    return np.tile(base, (N // base.shape[0], 1))
+
+
+@lru_cache(maxsize=None)
+def baseline_seconds(N, k, s, t):
+    """Tiempo de la construcción algebraica de OA(N,k,s,t), o None si no hay."""
+    start = time.perf_counter()
+    oa = construct_oa(N, k, s, t)
+    return time.perf_counter() - start if oa is not None else None
+
+
+def generate_oa_construction(N, k, s, t, verbose=True, stats=None):
+    stats = stats if stats is not None else RunStats()
+    start = time.time()
+    with stats.phase("build"):
+        oa_matrix = construct_oa(N, k, s, t)
+    runtime = round(time.time() - start, 4)
+    if oa_matrix is not None:
+        stats.set_status("solved")
+        return oa_matrix, runtime
+    # Solo N no múltiplo de s^t prueba que no existe; que no haya
+    # construcción conocida no dice nada
+    stats.set_status("infeasible" if N % s ** t else "unknown", "no_construction")
+    if verbose:
+        print(f"No hay construcción algebraica (Rao–Hamming / Bush) para OA({N},{k},{s},{t}).")
+    return None, runtime
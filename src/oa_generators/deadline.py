@@ -0,0 +1,88 @@
+import time
+
+# Nombre de la opción de límite de tiempo (s) de cada interfaz de Pyomo
+TIME_LIMIT_OPTIONS = {
+    'gurobi': 'TimeLimit',
+    'gurobi_direct': 'TimeLimit',
+    'gurobi_persistent': 'TimeLimit',
+    'cplex': 'timelimit',
+    'cplex_direct': 'timelimit',
+    'cplex_persistent': 'timelimit',
+    'cbc': 'sec',
+    'appsi_cbc': 'sec',
+    'appsi_highs': 'time_limit',
+    'glpk': 'tmlim',
+}
+
+
+class Deadline:
+    """
+    Límite de tiempo de reloj de una llamada completa a un generador.
+
+    Se crea una vez por llamada y se pasa a cada subproblema (recursión del
+    backtracking, reintentos, ramas en paralelo), que usa como límite propio
+    el tiempo que queda. Con time_limit=None no hay límite. Usa el reloj
+    monótono del sistema, así que sigue siendo válido en procesos hijos.
+    """
+
+    def __init__(self, time_limit=None):
+        self.time_limit = time_limit
+        self.start = time.monotonic()
+        self.end = None if time_limit is None else self.start + time_limit
+
+    def elapsed(self):
+        """Segundos desde el inicio de la llamada (redondeados como los runtime)."""
+        return round(time.monotonic() - self.start, 4)
+
+    def remaining(self):
+        """Segundos que quedan (>= 0), o None si no hay límite."""
+        if self.end is None:
+            return None
+        return max(0.0, self.end - time.monotonic())
+
+    def expired(self):
+        return self.end is not None and time.monotonic() >= self.end
+
+    def cap(self, limit=None):
+        """El menor entre limit y el tiempo que queda (None si ninguno limita)."""
+        remaining = self.remaining()
+        if remaining is None:
+            return limit
+        return remaining if limit is None else min(limit, remaining)
+
+
+def set_solver_time_limit(opt, solver, seconds):
+    """
+    Fija el límite de tiempo de un solver de Pyomo si la interfaz es conocida.
+    Devuelve False si no se sabe cómo hacerlo (solo se controlará el plazo
+    entre subproblemas).
+    """
+    if seconds is None:
+        return True
+    option = TIME_LIMIT_OPTIONS.get(solver)
+    if option is None:
+        return False
+    opt.options[option] = max(1, int(seconds + 0.999)) if solver in ('cbc', 'appsi_cbc', 'glpk') else seconds
+    return True
+
+
+def pyomo_status(termination_condition):
+    """Traduce la TerminationCondition de Pyomo a un status de RunStats."""
+    name = str(termination_condition)
+    if name in ("optimal", "feasible", "globallyOptimal", "locallyOptimal"):
+        return "solved"
+    if name in ("maxTimeLimit", "maxEvaluations", "maxIterations", "userInterrupt"):
+        return "timeout"
+    if name == "infeasible":
+        return "infeasible"
+    return "unknown"
+
+
+def hexaly_status(solution_status, time_limit=None):
+    """Traduce el HxSolutionStatus de Hexaly a un status de RunStats."""
+    name = str(solution_status).rsplit(".", 1)[-1]
+    if name in ("FEASIBLE", "OPTIMAL"):
+        return "solved"
+    if name == "INCONSISTENT":
+        return "infeasible"
+    return "timeout" if time_limit is not None else "unknown"
@@ -1,10 +1,18 @@
 import numpy as np
-from itertools import combinations, product
+from itertools import product
+from functools import partial
 import time
 import hexaly.optimizer
 
+from .instrumentation import RunStats
+from .column_classes import ClassCache
+from .parallel_search import parallel_backtrack, branch_threads
+from .deadline import Deadline, hexaly_status
+from .solver_stats import hexaly_solve_stats
 
-def select_next_column_hexaly(fixed, s, t, λ, forbidden=None, time_limit=10, verbose=False):
+
+def select_next_column_hexaly(fixed, s, t, λ, forbidden=None, time_limit=10, verbose=False, stats=None,
+                             classes=None, deadline=None, solver_seed=None):
     """
     Construye una nueva columna que extiende una matriz OA parcial 'fixed',
     fijando además un orden lexicográfico en la propia columna.
@@ -12,15 +20,14 @@ def select_next_column_hexaly(fixed, s, t, λ, forbidden=None, time_limit=10, ve
     N, p_minus_1 = fixed.shape
     if forbidden is None:
         forbidden = []
+    if stats is None:
+        stats = RunStats()
+
+    build_start = time.perf_counter()
 
-    # Pre-cálculo de las "clases" para ortogonalidad
-    subsets = list(combinations(range(p_minus_1), t - 1))
-    classes = {}
-    for U in subsets:
-        block = fixed[:, U]
-        for v_fixed in product(range(s), repeat=t - 1):
-            rows = np.where((block == v_fixed).all(axis=1))[0]
-            classes[(U, v_fixed)] = rows
+    # "Clases" para ortogonalidad (reutilizadas entre reintentos si se pasan)
+    if classes is None:
+        classes = ClassCache(fixed, s, t)
 
     with hexaly.optimizer.HexalyOptimizer() as optimizer:
         model = optimizer.model
@@ -54,7 +61,7 @@ def select_next_column_hexaly(fixed, s, t, λ, forbidden=None, time_limit=10, ve
             )
 
         # 4) Ortogonalidad: para cada clase (u_idx,v_fixed), contamos v_new
-        for rows in classes.values():
+        for _, _, rows in classes.classes():
             for v_new in range(s):
                 model.constraint(
                     model.sum(new_col[i] == v_new for i in rows)
@@ -75,47 +82,87 @@ def select_next_column_hexaly(fixed, s, t, λ, forbidden=None, time_limit=10, ve
             #model.minimize(new_col[i])
         model.minimize(model.create_constant(0))
         model.close()
+        stats.record("build", time.perf_counter() - build_start)
 
         # 7) Parámetros y resolución
-        optimizer.param.time_limit = time_limit
+        # Límite por columna, recortado al plazo global (Hexaly: segundos enteros)
+        if deadline is not None:
+            time_limit = deadline.cap(time_limit)
+        optimizer.param.time_limit = max(1, int(time_limit))
         optimizer.param.verbosity  = 1 if verbose else 0
-        optimizer.solve()
+        if solver_seed is not None:
+            optimizer.param.seed = solver_seed
+        if branch_threads() is not None:
+            optimizer.param.nb_threads = branch_threads()
+        with stats.phase("solve"):
+            optimizer.solve()
+        stats.add_solve(hexaly_solve_stats(optimizer))
 
         # 8) Lectura de la solución
         status = optimizer.solution.status
+        stats.solver_status = str(status)
+        if hexaly_status(status, time_limit) == "timeout":
+            stats.subproblem_timeouts += 1
         if status in (hexaly.optimizer.HxSolutionStatus.FEASIBLE,
                       hexaly.optimizer.HxSolutionStatus.OPTIMAL):
-            return np.array([v.value for v in new_col_vars], dtype=int)
+            with stats.phase("extract"):
+                return np.array([v.value for v in new_col_vars], dtype=int)
         else:
             return None
 
-def backtrack_build_hexaly(fixed, N, k, s, t, λ, time_limit=10):
+def backtrack_build_hexaly(fixed, N, k, s, t, λ, time_limit=10, stats=None, classes=None, stop=None,
+                           deadline=None, solver_seed=None):
     """
     Construye recursivamente un OA por método de generación columna a columna.
+    time_limit es el límite de cada columna; deadline, el plazo global.
     """
     p = fixed.shape[1]
+    if stats is not None:
+        stats.add_partial(fixed)
     if p == k:
         return fixed
+    if classes is None:
+        classes = ClassCache(fixed, s, t)
 
     print(f"Intentando extender... columnas actuales: {p}/{k}")
     forbidden = []
 
     while True:
-        new_col = select_next_column_hexaly(fixed, s, t, λ, forbidden, time_limit)
+        if (stop is not None and stop.is_set()) or (deadline is not None and deadline.expired()):
+            return None
+        col_start = time.perf_counter()
+        new_col = select_next_column_hexaly(fixed, s, t, λ, forbidden, time_limit, stats=stats, classes=classes,
+                                           deadline=deadline, solver_seed=solver_seed)
+        if stats is not None:
+            stats.add_column_time(p, time.perf_counter() - col_start)
         if new_col is None:
             return None
         candidate = np.hstack((fixed, new_col.reshape(-1, 1)))
-        result = backtrack_build_hexaly(candidate, N, k, s, t, λ, time_limit)
+        classes.push(new_col)
+        result = backtrack_build_hexaly(candidate, N, k, s, t, λ, time_limit, stats, classes, stop, deadline,
+                                        solver_seed)
         if result is not None:
             return result
+        classes.pop()
         print("Backtracking: columna fallida", list(map(int, new_col)))
         forbidden.append(new_col)
+        if stats is not None:
+            stats.backtracks += 1
 
 
-def generate_oa_hexaly_column_by_column(N, k, s, t, time_limit=1000):
+def generate_oa_hexaly_column_by_column(N, k, s, t, time_limit=None, stats=None, workers=1,
+                                        column_time_limit=1000, solver_seed=None):
     """
     Punto de entrada principal para generar un OA con Hexaly y backtracking.
+    Con workers != 1 las candidatas de la primera columna libre se exploran
+    en paralelo (ver parallel_search.parallel_backtrack).
+    time_limit (s) es el plazo de toda la llamada y column_time_limit el de
+    cada columna. Al vencer el plazo devuelve (None, runtime) con
+    stats.status == "timeout" y la OA parcial más ancha en stats.partial; si
+    se agota la búsqueda, (None, runtime) con stats.status == "unknown".
+    solver_seed fija la semilla de Hexaly en cada columna.
     """
+    deadline = Deadline(time_limit)
     λ = N // (s ** t)
     if N != λ * (s ** t):
         raise ValueError("Parámetros incoherentes: N ≠ λ·s^t")
@@ -123,12 +170,35 @@ def generate_oa_hexaly_column_by_column(N, k, s, t, time_limit=1000):
     base = np.array(list(product(range(s), repeat=t)))
     fixed = np.repeat(base, λ, axis=0)
 
+    if stats is None:
+        stats = RunStats()
+
     start = time.time()
-    OA = backtrack_build_hexaly(fixed, N, k, s, t, λ, time_limit)
+    if workers == 1 or t >= k:
+        OA = backtrack_build_hexaly(fixed, N, k, s, t, λ, column_time_limit, stats, deadline=deadline,
+                                    solver_seed=solver_seed)
+    else:
+        classes = ClassCache(fixed, s, t)
+        stats.add_partial(fixed)
+        OA = parallel_backtrack(
+            fixed,
+            lambda forbidden: select_next_column_hexaly(fixed, s, t, λ, forbidden, column_time_limit,
+                                                        stats=stats, classes=classes, deadline=deadline,
+                                                        solver_seed=solver_seed),
+            partial(backtrack_build_hexaly, N=N, k=k, s=s, t=t, λ=λ, time_limit=column_time_limit,
+                    deadline=deadline, solver_seed=solver_seed),
+            workers, stats, deadline)
     runtime = time.time() - start
 
     if OA is None:
-        raise RuntimeError("No se encontró OA factible.")
+        if deadline.expired():
+            stats.set_status("timeout")
+            return None, round(runtime, 4)
+        # Una columna descartada por límite de tiempo no prueba nada
+        stats.set_status("unknown")
+        print("No se encontró OA factible.")
+        return None, round(runtime, 4)
+    stats.set_status("solved")
     return OA, round(runtime, 4)
 
 
@@ -1,28 +1,45 @@
-from pyomo.environ import *
 from itertools import product, combinations
-import numpy as np
 import time
 import hexaly.optimizer
 
-def generate_oa_row_selection_hexaly(N, k, s, t, verbose=True):
+from .row_universe import RowUniverse, projection_index
+from .instrumentation import RunStats
+from .warmstart import prepare_seed, complete_seed_rows
+from .deadline import Deadline, hexaly_status
+from .solver_stats import hexaly_solve_stats
+
+def generate_oa_row_selection_hexaly(N, k, s, t, verbose=True, stats=None, seed=None, time_limit=None,
+                                     solver_seed=None):
     """
-    Genera un Orthogonal Array usando Pyomo + Gurobi.
+    Genera un Orthogonal Array con Hexaly, con un booleano por cada fila del
+    universo de las s^k posibles. Las restricciones de conteo se construyen
+    desde el índice de proyección (projection_index), así que su tamaño total
+    es el número de coeficientes no nulos, C(k,t)·s^k.
     Devuelve (OA_matrix, runtime_en_segundos) o (None, None) si no hay solución.
+    Las filas de seed (ver warmstart.prepare_seed), con las celdas desconocidas
+    completadas por warmstart.complete_seed_rows, son los valores iniciales
+    de la búsqueda. time_limit (s) es el plazo de toda la llamada,
+    construcción incluida. solver_seed fija la semilla de Hexaly.
     """
+    deadline = Deadline(time_limit)
     λ = N // (s ** t)
     if N != s ** t * λ:
         if verbose:
             print("Parámetros inconsistentes: N debe ser igual a s^t * λ.")
         return None, None
-    
+    if stats is None:
+        stats = RunStats()
+
     with hexaly.optimizer.HexalyOptimizer() as optimizer:
+        build_start = time.perf_counter()
 
         model = optimizer.model
 
-        ALL_ROWS = list(product(range(s), repeat=k))
-        ROW_IDX = range(len(ALL_ROWS))
+        UNIVERSE = RowUniverse(s, k)
+        ROW_IDX = range(len(UNIVERSE))
         COL_COMBOS = list(combinations(range(k), t))
         TUPLES = list(product(range(s), repeat=t))
+        INDEX = projection_index(s, k, t, COL_COMBOS, UNIVERSE)
         
         rows = [model.bool() for _ in ROW_IDX]
 
@@ -30,10 +47,7 @@ def generate_oa_row_selection_hexaly(N, k, s, t, verbose=True):
         
         for column_combo in COL_COMBOS:
             for s_tuple in TUPLES:
-                matching_rows = [
-                    i for i, row in enumerate(ALL_ROWS)
-                    if tuple(row[column] for column in column_combo) == s_tuple
-                ]
+                matching_rows = INDEX[(column_combo, s_tuple)].tolist()
                 model.constraint(model.sum(rows[i] for i in matching_rows) == λ)
 
         # Rompimiento de simetría: fijar la primera fila (0,0,...,0)
@@ -44,14 +58,33 @@ def generate_oa_row_selection_hexaly(N, k, s, t, verbose=True):
         model.minimize(0)
         model.close()
 
+        if seed is not None:
+            seed, _ = prepare_seed(seed, N, k, s)
+            # Las filas parciales se completan equilibrando cada columna
+            for i in UNIVERSE.encode(complete_seed_rows(seed, s)):
+                rows[int(i)].value = 1
+        stats.record("build", time.perf_counter() - build_start)
+        if verbose:
+            print(f"Tiempo de construcción del modelo: {round(stats.phases['build'], 4)} segundos")
+
         start = time.time()
-        optimizer.solve()
+        if time_limit is not None:
+            # Hexaly solo admite segundos enteros
+            optimizer.param.time_limit = max(1, int(deadline.remaining()))
+        if solver_seed is not None:
+            optimizer.param.seed = solver_seed
+        with stats.phase("solve"):
+            optimizer.solve()
+        stats.add_solve(hexaly_solve_stats(optimizer))
+        stats.set_status(hexaly_status(optimizer.solution.status, time_limit), optimizer.solution.status)
         end = time.time()
         runtime = end - start
 
+        oa_matrix = None
         if optimizer.solution.status in [hexaly.optimizer.HxSolutionStatus.FEASIBLE, hexaly.optimizer.HxSolutionStatus.OPTIMAL]:
-            selected = [i for i in ROW_IDX if rows[i].value > 0.5]
-            oa_matrix = np.array([ALL_ROWS[i] for i in selected], dtype=int)
+            with stats.phase("extract"):
+                selected = [i for i in ROW_IDX if rows[i].value > 0.5]
+                oa_matrix = UNIVERSE.decode(selected).astype(int)
             if verbose:
                 print("OA found:")
                 print(oa_matrix)
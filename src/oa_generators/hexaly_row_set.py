@@ -1,47 +1,92 @@
 import hexaly.optimizer
 from itertools import product, combinations
+import time
 
-# Parameters for the Orthogonal Array
-N = 343       # number of rows
-k = 5         # number of columns
-s = 7         # number of symbols
-t = 2         # strength
-λ = N // (s ** t)
-
-with hexaly.optimizer.HexalyOptimizer() as optimizer:
-    
-    model = optimizer.model
-
-    ALL_ROWS = list(product(range(s), repeat=k))
-    ROW_IDX = range(len(ALL_ROWS))
-    COL_COMBOS = list(combinations(range(k), t))
-    TUPLES = list(product(range(s), repeat=t))
-
-    rows = model.set(len(ALL_ROWS))
-
-    model.constraint(model.count(rows) == N)
-
-    for cj in COL_COMBOS:
-        for vj in TUPLES:
-            contributions = model.array([tuple(row[col] for col in cj) == vj for row in ALL_ROWS])
-            model.constraint(
-                model.sum(rows, model.lambda_function(lambda i: contributions[i])) == λ
-            )
-
-    # Symmetry breaking: first row is all zeros
-    
-    
-    model.minimize(0)
-    model.close()
-
-    optimizer.solve()
-
-    if optimizer.solution.status in [hexaly.optimizer.HxSolutionStatus.FEASIBLE, hexaly.optimizer.HxSolutionStatus.OPTIMAL]:
-        print("Solution found:")
-        print([var for var in rows.value])
-        print("Orthogonal Array:")
-        oa_matrix = [[ALL_ROWS[i][j] for j in range(k)] for i in rows.value]
-        for row in oa_matrix:
-            print(row) 
-
-    
\ No newline at end of file
+from .row_universe import RowUniverse
+from .instrumentation import RunStats
+from .warmstart import prepare_seed, complete_seed_rows
+from .deadline import Deadline, hexaly_status
+from .solver_stats import hexaly_solve_stats
+
+
+def generate_oa_row_set_hexaly(N, k, s, t, verbose=True, stats=None, seed=None, time_limit=None,
+                               solver_seed=None):
+    """
+    Genera un OA(N,k,s,t) con Hexaly eligiendo un conjunto de N filas del
+    universo de las s^k posibles (variable de conjunto).
+
+    Para cada t-subconjunto de columnas se crea un único array constante con
+    el código en base s de la proyección de cada fila del universo, compartido
+    por las s^t restricciones de conteo del subconjunto. La construcción es
+    así proporcional a C(k,t)·s^k y no a C(k,t)·s^t·s^k.
+    Devuelve (OA_matrix, runtime) o (None, runtime) si no hay solución.
+    time_limit (s) es el plazo de toda la llamada, construcción incluida. solver_seed fija la semilla de Hexaly.
+    """
+    deadline = Deadline(time_limit)
+    λ = N // (s ** t)
+    if N != s ** t * λ:
+        if verbose:
+            print("Parámetros inconsistentes: N debe ser igual a s^t * λ.")
+        return None, None
+    if stats is None:
+        stats = RunStats()
+
+    with hexaly.optimizer.HexalyOptimizer() as optimizer:
+        build_start = time.perf_counter()
+
+        model = optimizer.model
+
+        UNIVERSE = RowUniverse(s, k)
+        COL_COMBOS = list(combinations(range(k), t))
+        TUPLES = list(product(range(s), repeat=t))
+
+        rows = model.set(len(UNIVERSE))
+
+        model.constraint(model.count(rows) == N)
+
+        for cj in COL_COMBOS:
+            codes = model.array(UNIVERSE.projection_codes(cj).tolist())
+            for code in range(len(TUPLES)):
+                model.constraint(
+                    model.sum(rows, model.lambda_function(lambda i: codes[i] == code)) == λ
+                )
+
+        # Rompimiento de simetría: la fila (0,0,...,0) está en el conjunto
+        model.constraint(model.contains(rows, 0))
+
+        model.minimize(0)
+        model.close()
+
+        if seed is not None:
+            seed, _ = prepare_seed(seed, N, k, s)
+            # Las filas parciales se completan equilibrando cada columna
+            for i in UNIVERSE.encode(complete_seed_rows(seed, s)):
+                rows.value.add(int(i))
+        stats.record("build", time.perf_counter() - build_start)
+        if verbose:
+            print(f"Tiempo de construcción del modelo: {round(stats.phases['build'], 4)} segundos")
+
+        start = time.time()
+        if time_limit is not None:
+            # Hexaly solo admite segundos enteros
+            optimizer.param.time_limit = max(1, int(deadline.remaining()))
+        if solver_seed is not None:
+            optimizer.param.seed = solver_seed
+        with stats.phase("solve"):
+            optimizer.solve()
+        stats.add_solve(hexaly_solve_stats(optimizer))
+        stats.set_status(hexaly_status(optimizer.solution.status, time_limit), optimizer.solution.status)
+        runtime = time.time() - start
+
+        oa_matrix = None
+        if optimizer.solution.status in [hexaly.optimizer.HxSolutionStatus.FEASIBLE, hexaly.optimizer.HxSolutionStatus.OPTIMAL]:
+            with stats.phase("extract"):
+                selected = sorted(rows.value)
+                oa_matrix = UNIVERSE.decode(selected).astype(int)
+            if verbose:
+                print("OA found:")
+                print(oa_matrix)
+        else:
+            return None, runtime
+
+        return oa_matrix, runtime
@@ -0,0 +1,128 @@
+import time
+from contextlib import contextmanager
+
+from .solver_stats import NOT_AVAILABLE
+
+
+class RunStats:
+    """
+    Registro de una llamada a un generador de OAs.
+
+    Acumula el tiempo de cada fase (construcción del modelo, resolución y
+    extracción de la solución) sumando todas las llamadas al solver que haga
+    el generador, y para los métodos columna a columna el tiempo dedicado a
+    cada columna (incluidos los reintentos con columnas prohibidas).
+
+    También guarda cómo terminó la llamada: status ("solved", "timeout",
+    "infeasible" si hay prueba de que no existe, "unknown" en otro caso), el
+    estado devuelto por el último solver (solver_status), cuántos
+    subproblemas agotaron su límite de tiempo, cuántos terminaron de otra
+    forma sin solución ni prueba de infactibilidad (subproblem_failures:
+    error, límite de iteraciones, estado desconocido) y, en los métodos columna a
+    columna, la OA parcial más ancha alcanzada (partial): sus columnas son
+    una cota inferior del k alcanzable para ese N.
+
+    En resources quedan las medidas de memoria, CPU e hilos de la llamada
+    (ver profiling.ResourceProfiler). Las estadísticas internas de cada
+    llamada al solver (ver solver_stats) se acumulan con add_solve: nodos e
+    iteraciones se suman y gap y tamaños se quedan con el máximo, junto con
+    el número de subproblemas resueltos y de columnas descartadas al hacer
+    backtracking. model_cache es "hit" o "miss" si el modelo salió de la
+    caché en disco (ver model_cache.ModelCache).
+    """
+
+    PHASES = ("build", "solve", "extract")
+    STATUSES = ("solved", "timeout", "infeasible", "unknown")
+    SOLVE_SUMS = ("bb_nodes", "iterations")
+    SOLVE_MAXES = ("mip_gap", "model_rows", "model_cols", "model_nnz",
+                   "presolved_rows", "presolved_cols", "presolved_nnz")
+    SOLVE_LABELS = ("presolve_source",)
+
+    def __init__(self):
+        self.phases = dict.fromkeys(self.PHASES, 0.0)
+        self.column_times = {}
+        self.status = None
+        self.solver_status = None
+        self.subproblem_timeouts = 0
+        self.subproblem_failures = 0
+        self.partial = None
+        self.resources = {}
+        self.subproblems = 0
+        self.backtracks = 0
+        self.solve_totals = {}
+        self.model_cache = None
+        self.cache_build_sec_saved = None
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] += time.perf_counter() - start
+
+    def record(self, name, seconds):
+        self.phases[name] += seconds
+
+    def add_column_time(self, column, seconds):
+        self.column_times[column] = self.column_times.get(column, 0.0) + seconds
+
+    def set_status(self, status, solver_status=None):
+        if status not in self.STATUSES:
+            raise ValueError(f"Estado desconocido: {status}")
+        self.status = status
+        if solver_status is not None:
+            self.solver_status = str(solver_status)
+
+    def add_partial(self, array):
+        """Guarda array como OA parcial si tiene más columnas que la guardada."""
+        if self.partial is None or array.shape[1] > self.partial.shape[1]:
+            self.partial = array.copy()
+
+    def add_solve(self, record, subproblems=1):
+        """Acumula las estadísticas normalizadas de una llamada al solver."""
+        self.subproblems += subproblems
+        for key, value in record.items():
+            if value is None:
+                continue
+            if key in self.SOLVE_LABELS:
+                # Todas las llamadas de un generador usan el mismo solver: vale la
+                # primera que lo conozca
+                if self.solve_totals.get(key) in (None, NOT_AVAILABLE):
+                    self.solve_totals[key] = value
+            elif key in self.SOLVE_SUMS:
+                self.solve_totals[key] = self.solve_totals.get(key, 0) + value
+            elif key in self.SOLVE_MAXES:
+                self.solve_totals[key] = max(self.solve_totals.get(key, value), value)
+
+    def merge(self, other):
+        """Suma los tiempos de otro RunStats (p. ej. el de un proceso del pool)."""
+        for name, value in other.phases.items():
+            self.record(name, value)
+        for column, seconds in other.column_times.items():
+            self.add_column_time(column, seconds)
+        self.subproblem_timeouts += other.subproblem_timeouts
+        self.subproblem_failures += other.subproblem_failures
+        self.backtracks += other.backtracks
+        self.add_solve(other.solve_totals, subproblems=other.subproblems)
+        if other.partial is not None:
+            self.add_partial(other.partial)
+
+    def as_metrics(self):
+        """Campos planos para log_oa_result."""
+        metrics = {f"{name}_sec": round(value, 4) for name, value in self.phases.items()}
+        metrics["column_times"] = ";".join(
+            f"{col}:{sec:.4f}" for col, sec in sorted(self.column_times.items()))
+        metrics["status"] = self.status
+        metrics["solver_status"] = self.solver_status
+        metrics["subproblem_timeouts"] = self.subproblem_timeouts
+        metrics["subproblem_failures"] = self.subproblem_failures
+        metrics["columns_reached"] = None if self.partial is None else int(self.partial.shape[1])
+        metrics["subproblems"] = self.subproblems
+        metrics["backtracks"] = self.backtracks
+        metrics.update({key: self.solve_totals.get(key)
+                        for key in self.SOLVE_SUMS + self.SOLVE_MAXES + self.SOLVE_LABELS})
+        metrics["model_cache"] = self.model_cache
+        metrics["cache_build_sec_saved"] = self.cache_build_sec_saved
+        metrics.update(self.resources)
+        return metrics
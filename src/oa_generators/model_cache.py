@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+import re
+import subprocess
+import tempfile
+import time
+
+from .solver_stats import _from_gurobi, _from_highs
+
+CACHE_DIR = os.path.join("..", "results", "model_cache")
+
+# Solvers que pueden resolver directamente el archivo del modelo
+FILE_SOLVERS = ('gurobi', 'gurobi_direct', 'gurobi_persistent', 'appsi_highs', 'highs', 'cbc', 'appsi_cbc')
+
+
+def model_key(formulation, sources, **params):
+    """
+    Clave de caché de un modelo: hash de la formulación, sus parámetros
+    (N, k, s, t y opciones) y el código fuente de los módulos que lo
+    construyen (sources), de forma que cualquier cambio en el generador o en
+    las funciones que definen sus restricciones invalida las entradas
+    anteriores.
+    """
+    code = hashlib.sha256()
+    for source in sources:
+        with open(source, "rb") as f:
+            code.update(f.read())
+    code = code.hexdigest()
+    payload = json.dumps({"formulation": formulation, "code": code, "params": params}, sort_keys=True)
+    return f"{formulation}_" + hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+
+class ModelCache:
+    """
+    Caché en disco de modelos de Pyomo ya construidos, escritos en MPS (o LP)
+    con los nombres simbólicos de las variables. La primera vez se construye
+    el modelo y se escribe; las siguientes ejecuciones, con cualquier solver
+    de FILE_SOLVERS, leen el archivo sin volver a construir nada en Python.
+    Junto a cada modelo se guarda en <clave>.json el tiempo que costó
+    construirlo, que es lo que se ahorra en cada acierto.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, fmt="mps"):
+        self.cache_dir = cache_dir
+        self.fmt = fmt
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.{self.fmt}")
+
+    def _replace(self, write, path):
+        # Se escribe con otro nombre y se renombra: otro proceso nunca ve un archivo a medias
+        fd, tmp = tempfile.mkstemp(suffix=os.path.splitext(path)[1], dir=self.cache_dir)
+        os.close(fd)
+        try:
+            write(tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    def _read_meta(self, meta_path):
+        """Metadatos de una entrada, o None si no hay o no se pueden leer (se reconstruye)."""
+        try:
+            with open(meta_path) as f:
+                return {"build_sec": float(json.load(f)["build_sec"])}
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def get_or_write(self, key, build, stats=None, params=None):
+        """
+        Devuelve la ruta del modelo 'key', construyéndolo con build() y
+        escribiéndolo si no está. En stats se anotan el acierto o fallo
+        (model_cache) y el tiempo de construcción ahorrado.
+        """
+        path = self.path(key)
+        meta_path = os.path.join(self.cache_dir, f"{key}.json")
+        # El .json se escribe después del modelo: si se puede leer, el modelo está completo
+        meta = self._read_meta(meta_path) if os.path.exists(path) else None
+        if meta is not None:
+            if stats is not None:
+                stats.model_cache = "hit"
+                stats.cache_build_sec_saved = meta["build_sec"]
+            print(f"[ModelCache] Acierto: {path} (ahorra {meta['build_sec']:.2f} s de construcción)")
+            return path
+
+        build_start = time.perf_counter()
+        model = build()
+        self._replace(lambda tmp: model.write(tmp, format=self.fmt, io_options={"symbolic_solver_labels": True}),
+                      path)
+        build_sec = time.perf_counter() - build_start
+        meta = {"key": key, "build_sec": round(build_sec, 4), "params": params or {},
+                "created": time.strftime("%Y-%m-%d %H:%M:%S")}
+
+        def write_meta(tmp):
+            with open(tmp, "w") as f:
+                json.dump(meta, f)
+
+        self._replace(write_meta, meta_path)
+        if stats is not None:
+            stats.record("build", build_sec)
+            stats.model_cache = "miss"
+        print(f"[ModelCache] Fallo: modelo construido y guardado en {path} ({build_sec:.2f} s)")
+        return path
+
+
+def _solve_highs(path, time_limit, solver_seed, stats):
+    import highspy
+    h = highspy.Highs()
+    h.setOptionValue("output_flag", False)
+    if time_limit is not None:
+        h.setOptionValue("time_limit", float(time_limit))
+    if solver_seed is not None:
+        h.setOptionValue("random_seed", int(solver_seed))
+    with stats.phase("build"):
+        h.readModel(path)
+    with stats.phase("solve"):
+        # presolve() explícito para registrar el tamaño del modelo presolvido
+        h.presolve()
+        h.run()
+    status = h.getModelStatus()
+    stats.add_solve(_from_highs(h))
+    if status == highspy.HighsModelStatus.kOptimal:
+        values = dict(zip(h.getLp().col_names_, h.getSolution().col_value))
+        return "solved", h.modelStatusToString(status), values
+    if status == highspy.HighsModelStatus.kInfeasible:
+        return "infeasible", h.modelStatusToString(status), {}
+    if status == highspy.HighsModelStatus.kTimeLimit:
+        return "timeout", h.modelStatusToString(status), {}
+    return "unknown", h.modelStatusToString(status), {}
+
+
+def _solve_gurobi(path, time_limit, solver_seed, stats):
+    import gurobipy
+    with stats.phase("build"):
+        model = gurobipy.read(path)
+    model.Params.OutputFlag = 0
+    if time_limit is not None:
+        model.Params.TimeLimit = time_limit
+    if solver_seed is not None:
+        model.Params.Seed = int(solver_seed)
+    with stats.phase("solve"):
+        model.optimize()
+    stats.add_solve(_from_gurobi(model))
+    codes = {gurobipy.GRB.OPTIMAL: "solved", gurobipy.GRB.INFEASIBLE: "infeasible",
+             gurobipy.GRB.TIME_LIMIT: "timeout"}
+    status = codes.get(model.Status, "unknown")
+    if model.SolCount > 0 and status in ("solved", "timeout"):
+        return "solved", str(model.Status), {v.VarName: v.X for v in model.getVars()}
+    return status, str(model.Status), {}
+
+
+def _solve_cbc(path, time_limit, solver_seed, stats):
+    fd, solution = tempfile.mkstemp(suffix=".sol")
+    os.close(fd)
+    cmd = ["cbc", path]
+    if time_limit is not None:
+        cmd += ["sec", str(max(1, int(time_limit + 0.999)))]
+    if solver_seed is not None:
+        cmd += ["randomCbcSeed", str(int(solver_seed))]
+    cmd += ["solve", "solu", solution]
+    try:
+        with stats.phase("solve"):
+            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+        with open(solution) as f:
+            header = f.readline()
+            values = {}
+            for line in f:
+                # "  índice nombre valor coste_reducido" (las no nulas marcadas con ** si no son enteras)
+                tokens = line.replace("**", "").split()
+                if len(tokens) >= 3:
+                    values[tokens[1]] = float(tokens[2])
+    finally:
+        os.remove(solution)
+    stats.add_solve({})
+    if header.startswith("Optimal"):
+        return "solved", header.strip(), values
+    if "infeasible" in header.lower():
+        return "infeasible", header.strip(), {}
+    if "time" in header.lower():
+        status = "solved" if values and "integer" in header.lower() else "timeout"
+        return status, header.strip(), values if status == "solved" else {}
+    return "unknown", header.strip(), {}
+
+
+def solve_model_file(path, solver, stats, time_limit=None, solver_seed=None):
+    """
+    Resuelve un modelo guardado por ModelCache con el solver indicado (ver
+    FILE_SOLVERS), leyéndolo directamente del archivo. La lectura cuenta
+    como fase "build" y las estadísticas del solver se acumulan en stats.
+    Devuelve (status de RunStats, estado del solver, {nombre: valor}).
+    """
+    if solver.endswith("highs"):
+        return _solve_highs(path, time_limit, solver_seed, stats)
+    if solver.startswith("gurobi"):
+        return _solve_gurobi(path, time_limit, solver_seed, stats)
+    if solver.endswith("cbc"):
+        return _solve_cbc(path, time_limit, solver_seed, stats)
+    raise ValueError(f"El solver {solver} no puede leer modelos de la caché")
+
+
+def indexed_values(values, var_name):
+    """{índice: valor} de las variables var_name(i) de una solución leída del archivo."""
+    pattern = re.compile(rf"^{re.escape(var_name)}\((\d+)\)$")
+    result = {}
+    for name, value in values.items():
+        match = pattern.match(name)
+        if match:
+            result[int(match.group(1))] = value
+    return result
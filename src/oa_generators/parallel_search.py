@@ -0,0 +1,167 @@
+import multiprocessing as mp
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+
+from .instrumentation import RunStats
+from .profiling import _proc_children
+
+_POOL_STOP = None
+_BRANCH_THREADS = None
+
+# Nombre de la opción de nº de hilos de cada interfaz de Pyomo
+THREAD_OPTIONS = {
+    'gurobi': 'Threads',
+    'gurobi_direct': 'Threads',
+    'gurobi_persistent': 'Threads',
+    'cplex': 'threads',
+    'cplex_direct': 'threads',
+    'cplex_persistent': 'threads',
+    'cbc': 'threads',
+    'appsi_cbc': 'threads',
+    'appsi_highs': 'threads',
+}
+
+# Espera (s) a las ramas en curso cuando vence el plazo global
+DEADLINE_GRACE = 5
+
+
+def available_cores():
+    """Núcleos que puede usar este proceso (respeta la afinidad fijada por oa_batch)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def branch_threads():
+    """
+    Hilos que puede usar el solver de un subproblema: dentro de un proceso
+    del pool, los núcleos repartidos entre los workers (al menos 1); fuera
+    de él, None (el solver usa su valor por defecto).
+    """
+    return _BRANCH_THREADS
+
+
+def set_solver_threads(opt, solver, threads):
+    """Limita los hilos de un solver de Pyomo si threads no es None y la interfaz es conocida."""
+    option = THREAD_OPTIONS.get(solver)
+    if threads is None or option is None:
+        return False
+    opt.options[option] = int(threads)
+    return True
+
+
+def _init_branch_worker(stop, threads):
+    global _POOL_STOP, _BRANCH_THREADS
+    _POOL_STOP = stop
+    _BRANCH_THREADS = threads
+
+
+def _terminate_workers(executor):
+    """
+    Mata los procesos del pool, y los solvers que hayan lanzado, que sigan
+    resolviendo un subproblema: sin esto el intérprete espera a que terminen
+    al salir, y un subproblema sin plazo puede no terminar nunca.
+    """
+    processes = list((executor._processes or {}).values())
+    for process in processes:
+        for child in _proc_children(process.pid):
+            try:
+                os.kill(child, signal.SIGKILL)
+            except OSError:
+                pass
+        process.terminate()
+    for process in processes:
+        process.join(timeout=1)
+
+
+def _explore_branch(build, candidate):
+    """
+    Tarea del pool: intenta completar el subárbol que empieza en candidate y
+    activa la señal de parada compartida si lo consigue. Devuelve
+    (OA o None, RunStats del subárbol).
+    """
+    stats = RunStats()
+    if _POOL_STOP.is_set():
+        return None, stats
+    result = build(candidate, stats=stats, stop=_POOL_STOP)
+    if result is not None:
+        _POOL_STOP.set()
+    return result, stats
+
+
+def parallel_backtrack(fixed, next_column, build, workers=None, stats=None, deadline=None):
+    """
+    Backtracking columna a columna con la primera profundidad en paralelo.
+
+    El proceso principal pide con next_column(forbidden) columnas candidatas
+    distintas para extender fixed (cada una se prohíbe para la siguiente) y
+    reparte el subárbol de cada candidata entre 'workers' procesos (por
+    defecto, todos los núcleos disponibles), manteniendo como mucho uno en
+    vuelo por proceso. build(candidate, stats=..., stop=...) es el
+    backtrack_build del módulo con el resto de argumentos ya fijados (p. ej.
+    con functools.partial); debe abandonar en cuanto stop esté activa. En
+    cuanto un subárbol llega a k columnas se activa la parada, se matan los
+    procesos que sigan resolviendo un subproblema y se devuelve la OA. Los
+    solvers de cada rama deben limitarse a branch_threads() hilos para no
+    saturar la máquina. Devuelve None si se agotan las candidatas o si vence
+    deadline (también se activa la parada).
+    """
+    workers = workers or available_cores()
+    ctx = mp.get_context()
+    stop = ctx.Event()
+    threads = max(1, available_cores() // workers)
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                   initializer=_init_branch_worker, initargs=(stop, threads))
+    forbidden = []
+    pending = set()
+    exhausted = False
+    result = None
+
+    def collect(done):
+        nonlocal result
+        for future in done:
+            oa, branch_stats = future.result()
+            if stats is not None:
+                stats.merge(branch_stats)
+                if oa is None and not stop.is_set():
+                    stats.backtracks += 1  # la rama de esta candidata se agotó
+            if oa is not None and result is None:
+                result = oa
+
+    try:
+        while True:
+            if deadline is not None and deadline.expired():
+                # Los subproblemas en curso tienen el mismo plazo: se espera
+                # un momento a que terminen para conservar sus OAs parciales
+                stop.set()
+                done, pending = wait(pending, timeout=DEADLINE_GRACE)
+                collect(done)
+                break
+            while not exhausted and not stop.is_set() and len(pending) < workers:
+                col_start = time.perf_counter()
+                newcol = next_column(forbidden)
+                if stats is not None:
+                    stats.add_column_time(fixed.shape[1], time.perf_counter() - col_start)
+                if newcol is None:
+                    exhausted = True
+                    break
+                forbidden.append(newcol)
+                candidate = np.hstack((fixed, newcol.reshape(-1, 1)))
+                pending.add(executor.submit(_explore_branch, build, candidate))
+            if not pending:
+                break
+            timeout = deadline.remaining() if deadline is not None else None
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            collect(done)
+            if result is not None:
+                stop.set()
+                break
+    finally:
+        if pending:
+            _terminate_workers(executor)
+        executor.shutdown(wait=False, cancel_futures=True)
+    return result
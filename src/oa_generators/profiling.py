@@ -0,0 +1,161 @@
+import glob
+import os
+import resource
+import threading
+import time
+import tracemalloc
+
+try:
+    import psutil
+except ImportError:  # opcional: sin psutil se lee /proc (Linux) o se usa getrusage
+    psutil = None
+
+# Periodo (s) de muestreo de memoria e hilos
+SAMPLE_INTERVAL = 0.05
+
+
+def _proc_children(pid):
+    children = []
+    for path in glob.glob(f"/proc/{pid}/task/*/children"):
+        try:
+            with open(path) as f:
+                children.extend(int(c) for c in f.read().split())
+        except OSError:
+            pass
+    return children
+
+
+def _proc_status(pid):
+    """(RSS en bytes, nº de hilos) de un proceso según /proc/<pid>/status."""
+    rss = threads = 0
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    rss = int(line.split()[1]) * 1024
+                elif line.startswith("Threads:"):
+                    threads = int(line.split()[1])
+    except OSError:  # el proceso ya ha terminado
+        pass
+    return rss, threads
+
+
+def _tree_usage_psutil(proc):
+    rss, threads = proc.memory_info().rss, proc.num_threads()
+    for child in proc.children(recursive=True):
+        try:
+            rss += child.memory_info().rss
+            threads += child.num_threads()
+        except psutil.NoSuchProcess:
+            pass
+    return rss, threads
+
+
+def _tree_usage_proc(pid):
+    rss, threads = _proc_status(pid)
+    for child in _proc_children(pid):
+        child_rss, child_threads = _tree_usage_proc(child)
+        rss += child_rss
+        threads += child_threads
+    return rss, threads
+
+
+def _tree_usage_function():
+    """Función sin argumentos que mide (RSS, hilos) del proceso y sus descendientes, o None."""
+    if psutil is not None:
+        proc = psutil.Process()
+        return lambda: _tree_usage_psutil(proc)
+    if os.path.exists(f"/proc/{os.getpid()}/status"):
+        pid = os.getpid()
+        return lambda: _tree_usage_proc(pid)
+    return None
+
+
+class ResourceProfiler:
+    """
+    Mide los recursos de una llamada a un generador y los deja en
+    stats.resources (y de ahí en RunStats.as_metrics):
+
+    - peak_rss_mb: pico de memoria residente del proceso más la de sus
+      descendientes (solvers lanzados por Pyomo, procesos del pool), muestreada
+      cada SAMPLE_INTERVAL s con psutil o, si no está, leyendo /proc. Sin
+      ninguno de los dos es el ru_maxrss de getrusage, que es el pico de toda
+      la vida del proceso (rss_source lo indica).
+    - heap_peak_mb: pico del heap de Python con tracemalloc (solo si
+      trace_heap). Cubre la construcción del modelo y la extracción, no la
+      memoria nativa de los solvers. tracemalloc ralentiza las
+      asignaciones, así que los tiempos de esa ejecución no son comparables.
+    - cpu_sec / children_cpu_sec: tiempo de CPU del proceso y de los hijos
+      ya terminados (p. ej. un cbc o gurobi_cl lanzado por Pyomo).
+    - cpu_wall_ratio: CPU total / tiempo de reloj (> 1 con solvers multihilo).
+    - peak_threads: máximo de hilos del proceso y sus descendientes.
+    """
+
+    def __init__(self, stats, trace_heap=False, interval=SAMPLE_INTERVAL):
+        self.stats = stats
+        self.trace_heap = trace_heap
+        self.interval = interval
+        self.usage = _tree_usage_function()
+        self.peak_rss = 0
+        self.peak_threads = 0
+
+    def _sample(self):
+        rss, threads = self.usage()
+        self.peak_rss = max(self.peak_rss, rss)
+        self.peak_threads = max(self.peak_threads, threads)
+
+    def _sampler(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._own_tracing = self.trace_heap and not tracemalloc.is_tracing()
+        if self._own_tracing:
+            tracemalloc.start()
+        elif self.trace_heap:
+            tracemalloc.reset_peak()
+        self._stop = threading.Event()
+        self._thread = None
+        if self.usage is not None:
+            self._sample()
+            self._thread = threading.Thread(target=self._sampler, daemon=True)
+            self._thread.start()
+        self.cpu_start = os.times()
+        self.wall_start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.wall_start
+        cpu_end = os.times()
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._sample()
+
+        cpu = (cpu_end.user - self.cpu_start.user) + (cpu_end.system - self.cpu_start.system)
+        children_cpu = ((cpu_end.children_user - self.cpu_start.children_user)
+                        + (cpu_end.children_system - self.cpu_start.children_system))
+        resources = {
+            "wall_sec": round(wall, 4),
+            "cpu_sec": round(cpu, 4),
+            "children_cpu_sec": round(children_cpu, 4),
+            "cpu_wall_ratio": round((cpu + children_cpu) / wall, 3) if wall > 0 else None,
+        }
+        if self.usage is not None:
+            resources["peak_rss_mb"] = round(self.peak_rss / 2 ** 20, 2)
+            resources["peak_threads"] = self.peak_threads
+            resources["rss_source"] = "psutil" if psutil is not None else "proc"
+        else:
+            # ru_maxrss está en kB en Linux y en bytes en macOS
+            scale = 1 if os.uname().sysname == "Darwin" else 1024
+            own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+            children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+            resources["peak_rss_mb"] = round((own + children) / 2 ** 20, 2)
+            resources["peak_threads"] = threading.active_count()
+            resources["rss_source"] = "getrusage"
+        if self.trace_heap:
+            resources["heap_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2)
+            if self._own_tracing:
+                tracemalloc.stop()
+        self.stats.resources.update(resources)
+        return False
@@ -0,0 +1,79 @@
+import numpy as np
+from itertools import combinations, product
+
+
+class RowUniverse:
+    """
+    Universo implícito de las s^k filas posibles, en el mismo orden que
+    product(range(s), repeat=k). Cada fila se identifica por su índice, que es
+    su codificación en base s (la primera columna es la más significativa).
+
+    Las filas nunca se materializan como tuplas de Python: se decodifican bajo
+    demanda a matrices uint8 y los recorridos completos se hacen por bloques
+    de chunk_size filas.
+    """
+
+    def __init__(self, s, k, chunk_size=1 << 16):
+        self.s = s
+        self.k = k
+        self.size = s ** k
+        self.chunk_size = chunk_size
+        self.dtype = np.uint8 if s <= 256 else np.uint16
+        self.weights = s ** np.arange(k - 1, -1, -1, dtype=np.int64)
+
+    def __len__(self):
+        return self.size
+
+    def encode(self, rows):
+        """Devuelve los índices (int64) de una fila o de una matriz de filas."""
+        return np.asarray(rows, dtype=np.int64) @ self.weights
+
+    def decode(self, indices):
+        """Devuelve la matriz (n, k) de símbolos de las filas con esos índices."""
+        indices = np.asarray(indices, dtype=np.int64)
+        return ((indices[..., None] // self.weights) % self.s).astype(self.dtype)
+
+    def chunks(self):
+        """Genera (inicio, bloque) con bloques decodificados de chunk_size filas."""
+        for start in range(0, self.size, self.chunk_size):
+            stop = min(start + self.chunk_size, self.size)
+            yield start, self.decode(np.arange(start, stop, dtype=np.int64))
+
+    def projection_codes(self, cols):
+        """
+        Código en base s de la proyección de cada fila del universo sobre las
+        columnas cols, calculado por bloques sin decodificar el universo entero.
+        """
+        code_dtype = np.uint32 if self.s ** len(cols) < 2 ** 32 else np.int64
+        codes = np.empty(self.size, dtype=code_dtype)
+        for start, block in self.chunks():
+            proj = block[:, list(cols)].astype(np.int64) @ self.weights[self.k - len(cols):]
+            codes[start:start + len(block)] = proj
+        return codes
+
+
+def projection_index(s, k, t, col_combos=None, universe=None):
+    """
+    Precalcula, para el universo de las s^k filas posibles (en el orden de
+    product(range(s), repeat=k)), las filas que proyectan cada t-tupla.
+
+    Devuelve un diccionario {(cj, vj): array de índices de fila}, donde cj es un
+    t-subconjunto de columnas y vj una t-tupla de símbolos. Cada subconjunto se
+    resuelve en una sola pasada: se codifica la proyección de todas las filas
+    en base s y se agrupan los índices ordenando por código. Los arrays de un
+    mismo subconjunto son vistas de un único vector de s^k índices.
+    """
+    if universe is None:
+        universe = RowUniverse(s, k)
+    if col_combos is None:
+        col_combos = list(combinations(range(k), t))
+    tuples = list(product(range(s), repeat=t))
+
+    index = {}
+    for cj in col_combos:
+        codes = universe.projection_codes(cj)
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(s ** t + 1))
+        for code, vj in enumerate(tuples):
+            index[(tuple(cj), vj)] = order[bounds[code]:bounds[code + 1]]
+    return index
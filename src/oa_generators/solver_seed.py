@@ -0,0 +1,28 @@
+# Nombre de la opción de semilla aleatoria de cada interfaz de Pyomo
+SEED_OPTIONS = {
+    'gurobi': 'Seed',
+    'gurobi_direct': 'Seed',
+    'gurobi_persistent': 'Seed',
+    'cplex': 'randomseed',
+    'cplex_direct': 'randomseed',
+    'cplex_persistent': 'randomseed',
+    'cbc': 'randomCbcSeed',
+    'appsi_cbc': 'randomCbcSeed',
+    'appsi_highs': 'random_seed',
+}
+
+
+def set_solver_seed(opt, solver, seed):
+    """
+    Fija la semilla aleatoria de un solver de Pyomo si la interfaz es conocida.
+    Los tiempos de estos modelos cambian mucho con la semilla, así que las
+    repeticiones de un benchmark deben fijarla. Devuelve False si no se sabe
+    cómo hacerlo (el solver usará su semilla por defecto).
+    """
+    if seed is None:
+        return True
+    option = SEED_OPTIONS.get(solver)
+    if option is None:
+        return False
+    opt.options[option] = int(seed)
+    return True
@@ -0,0 +1,230 @@
+# Estadísticas internas de cada llamada a un solver, normalizadas con las
+# claves de RunStats.SOLVE_SUMS y RunStats.SOLVE_MAXES para sumarlas sobre
+# todos los subproblemas de un generador (ver RunStats.add_solve). Cada
+# función devuelve solo lo que el solver expone; lo que falta no se registra.
+#
+# - bb_nodes: nodos de branch and bound (ramas en CP-SAT).
+# - iterations: iteraciones de simplex (de LP en CP-SAT, de búsqueda local en Hexaly).
+# - mip_gap: gap relativo al terminar.
+# - model_rows / model_cols / model_nnz: tamaño del modelo enviado al solver.
+# - presolved_rows / presolved_cols / presolved_nnz: tamaño tras el presolve.
+# - presolve_source: de dónde sale ese tamaño ("highs", "gurobi", "cplex",
+#   "cpsat_log", "solver_log") o NOT_AVAILABLE si el solver no lo expone.
+#   Con las interfaces directas se presuelve aparte una copia del modelo
+#   después de resolver, fuera de la fase "solve".
+
+import io
+import re
+
+NOT_AVAILABLE = "not_available"
+
+# Línea del log con el tamaño tras el presolve: (filas, columnas, no nulos)
+PRESOLVE_LOG_PATTERNS = (
+    re.compile(r"Presolved: (\d+) rows, (\d+) columns, (\d+) nonzeros"),  # Gurobi
+    re.compile(r"Reduced MIP has (\d+) rows, (\d+) columns, and (\d+) nonzeros"),  # CPLEX
+    re.compile(r"processed model has (\d+) rows, (\d+) columns .*?and (\d+) elements"),  # CBC
+)
+
+
+def _gap(lower, upper):
+    try:
+        lower, upper = float(lower), float(upper)
+    except (TypeError, ValueError):
+        return None
+    if lower != lower or upper != upper or abs(upper) == float("inf") or abs(lower) == float("inf"):
+        return None
+    return abs(upper - lower) / max(abs(upper), 1e-10)
+
+
+def _positive(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value == value and value >= 0 else None
+
+
+def _from_log(text, source="solver_log"):
+    """Tamaño tras el presolve leído del log del solver (el primero que aparezca)."""
+    for pattern in PRESOLVE_LOG_PATTERNS:
+        match = pattern.search(text or "")
+        if match:
+            rows, cols, nnz = (int(x) for x in match.groups())
+            return {"presolved_rows": rows, "presolved_cols": cols, "presolved_nnz": nnz,
+                    "presolve_source": source}
+    return {"presolve_source": NOT_AVAILABLE}
+
+
+def _from_results(results):
+    """Lo que las interfaces de Pyomo por archivo (cbc, cplex, glpk, gurobi) dejan en results."""
+    record = {}
+    stats = results.solver.statistics
+    record["bb_nodes"] = _positive(stats.branch_and_bound.number_of_bounded_subproblems)
+    record["iterations"] = _positive(stats.black_box.number_of_iterations)
+    problem = results.problem
+    record["mip_gap"] = _gap(problem.lower_bound, problem.upper_bound)
+    for key, attr in (("model_rows", "number_of_constraints"), ("model_cols", "number_of_variables"),
+                      ("model_nnz", "number_of_nonzeros")):
+        record[key] = _positive(getattr(problem, attr, None)) or None
+    return record
+
+
+def _from_gurobi(model):
+    record = {"bb_nodes": model.NodeCount, "iterations": model.IterCount,
+              "model_rows": model.NumConstrs, "model_cols": model.NumVars, "model_nnz": model.NumNZs}
+    if model.IsMIP and model.SolCount > 0:
+        record["mip_gap"] = model.MIPGap
+    try:
+        presolved = model.presolve()  # copia presuelta; el modelo original no cambia
+        record.update(presolved_rows=presolved.NumConstrs, presolved_cols=presolved.NumVars,
+                      presolved_nnz=presolved.NumNZs, presolve_source="gurobi")
+        presolved.dispose()
+    except Exception:  # p. ej. presolve que demuestra infactibilidad
+        record["presolve_source"] = NOT_AVAILABLE
+    return record
+
+
+def _from_highs(highs):
+    info = highs.getInfo()
+    record = {"bb_nodes": info.mip_node_count, "iterations": info.simplex_iteration_count,
+              "mip_gap": _positive(info.mip_gap),
+              "model_rows": highs.getNumRow(), "model_cols": highs.getNumCol(), "model_nnz": highs.getNumNz()}
+    # run() no conserva el modelo presuelto (getPresolvedLp da 0 x 0): si no
+    # se llamó antes a presolve() se presuelve una copia
+    status = _presolve_status(highs)
+    if status not in ("kReduced", "kReducedToEmpty", "kNotReduced"):
+        copy = type(highs)()
+        copy.setOptionValue("output_flag", False)
+        copy.passModel(highs.getModel())
+        copy.presolve()
+        highs, status = copy, _presolve_status(copy)
+    if status in ("kReduced", "kReducedToEmpty"):
+        lp = highs.getPresolvedLp()
+    elif status == "kNotReduced":  # el presolve no quita nada
+        lp = highs.getLp()
+    else:  # infactible o no acotado ya en el presolve
+        record["presolve_source"] = NOT_AVAILABLE
+        return record
+    record.update(presolved_rows=lp.num_row_, presolved_cols=lp.num_col_,
+                  presolved_nnz=len(lp.a_matrix_.value_), presolve_source="highs")
+    return record
+
+
+def _presolve_status(highs):
+    return str(highs.getModelPresolveStatus()).split(".")[-1]
+
+
+def _from_cplex(cpx):
+    record = {"bb_nodes": cpx.solution.progress.get_num_nodes_processed(),
+              "iterations": cpx.solution.progress.get_num_iterations(),
+              "model_rows": cpx.linear_constraints.get_num(), "model_cols": cpx.variables.get_num(),
+              "model_nnz": cpx.linear_constraints.get_num_nonzeros()}
+    try:
+        record["mip_gap"] = cpx.solution.MIP.get_mip_relative_gap()
+    except Exception:  # no es un MIP o no hay solución
+        pass
+    # La API no da el tamaño presuelto: se presuelve una copia y se lee su log
+    log = io.StringIO()
+    try:
+        copy = type(cpx)(cpx)
+        copy.set_log_stream(None)
+        copy.set_warning_stream(None)
+        copy.set_error_stream(None)
+        copy.set_results_stream(log)
+        copy.presolve.presolve(copy.presolve.method.none)
+        copy.end()
+        record.update(_from_log(log.getvalue(), "cplex"))
+    except Exception:
+        record["presolve_source"] = NOT_AVAILABLE
+    return record
+
+
+def pyomo_solve_stats(opt, results):
+    """
+    Estadísticas de un opt.solve de Pyomo. Con las interfaces directas,
+    persistentes y APPSI se leen del modelo del solver (Gurobi, HiGHS,
+    CPLEX); con las de archivo, de results.
+    """
+    solver_model = getattr(opt, "_solver_model", None)
+    if solver_model is not None:
+        try:
+            name = type(solver_model).__module__
+            if name.startswith("gurobipy"):
+                return _from_gurobi(solver_model)
+            if name.startswith("highspy"):
+                return _from_highs(solver_model)
+            if name.startswith("cplex"):
+                return _from_cplex(solver_model)
+        except Exception:  # atributos no disponibles tras un fallo del solver
+            return {"presolve_source": NOT_AVAILABLE}
+    try:
+        record = _from_results(results)
+    except AttributeError:
+        record = {}
+    # Las interfaces por archivo guardan la salida del solver en _log
+    record.update(_from_log(getattr(opt, "_log", None)))
+    return record
+
+
+def capture_cpsat_log(solver):
+    """
+    Activa el log de búsqueda de CP-SAT sin imprimirlo y devuelve la lista
+    en la que se acumulan sus líneas, para pasarla a cpsat_solve_stats.
+    """
+    lines = []
+    solver.parameters.log_search_progress = True
+    solver.parameters.log_to_stdout = False
+    solver.log_callback = lines.append
+    return lines
+
+
+def _cpsat_count(text):
+    # CP-SAT separa los miles con apóstrofos: 1'216
+    return int(text.replace("'", ""))
+
+
+def _cpsat_presolved(log):
+    """
+    Tamaño del modelo presuelto según el bloque "Presolved ... model" del log:
+    "#Variables: n" y una línea "#kTipo: n (#literals: m)" por tipo de
+    restricción; los literales o términos cuentan como no nulos.
+    """
+    record = None
+    for line in log or ():
+        for text in line.splitlines():
+            if text.startswith("Presolved "):
+                record = {"presolved_rows": 0, "presolved_nnz": 0, "presolve_source": "cpsat_log"}
+            elif record is not None and "presolved_cols" in record and not text.startswith(("#", " ")):
+                return record
+            elif record is not None and text.startswith("#Variables:"):
+                record["presolved_cols"] = _cpsat_count(text.split()[1])
+            elif record is not None and text.startswith("#k"):
+                record["presolved_rows"] += _cpsat_count(text.split(":")[1].split()[0])
+                terms = re.search(r"#(?:literals|terms): ([\d']+)", text)
+                if terms:
+                    record["presolved_nnz"] += _cpsat_count(terms.group(1))
+    if record is None or "presolved_cols" not in record:
+        return {"presolve_source": NOT_AVAILABLE}
+    return record
+
+
+def cpsat_solve_stats(model, solver, log=None):
+    """
+    Estadísticas de un CpSolver.Solve. El tamaño tras el presolve solo se
+    conoce si el log se capturó con capture_cpsat_log (y hubo presolve).
+    """
+    response = solver.ResponseProto()
+    proto = model.Proto()
+    record = {"bb_nodes": solver.NumBranches(),
+              "iterations": response.num_lp_iterations,
+              "model_rows": len(proto.constraints), "model_cols": len(proto.variables)}
+    record.update(_cpsat_presolved(log))
+    return record
+
+
+def hexaly_solve_stats(optimizer):
+    """Estadísticas de un HexalyOptimizer.solve (Hexaly no expone ni nodos ni presolve)."""
+    model = optimizer.model
+    return {"iterations": optimizer.statistics.nb_iterations,
+            "model_rows": model.nb_constraints, "model_cols": model.nb_decisions,
+            "presolve_source": NOT_AVAILABLE}
@@ -0,0 +1,80 @@
+import numpy as np
+from itertools import product
+
+# Valor de las celdas desconocidas en una semilla parcial
+UNKNOWN = -1
+
+
+def canonical_seed(oa, s=None):
+    """
+    Lleva una OA completa a la forma que imponen las restricciones de simetría
+    de los generadores: se renombran los símbolos de cada columna para que la
+    primera fila sea todo ceros y se ordenan las filas lexicográficamente, de
+    modo que la primera fila es (0,...,0) y las primeras t columnas recorren
+    las t-tuplas en orden, cada una λ veces. Ambas operaciones conservan la
+    fuerza.
+    """
+    oa = np.asarray(oa, dtype=int)
+    s = s or int(oa.max()) + 1
+    relabeled = (oa - oa[0]) % s
+    return relabeled[np.lexsort(relabeled.T[::-1])]
+
+
+def prepare_seed(seed, N, k, s):
+    """
+    Ajusta una semilla a una matriz N×k de enteros con UNKNOWN en las celdas
+    sin valor: se recortan filas o columnas sobrantes y se rellenan las que
+    falten (p. ej. un diseño menor al que falta una columna). Si la semilla
+    resultante es completa se pasa a forma canónica (canonical_seed); si
+    cada columna es del todo conocida o del todo desconocida, se pasa a
+    forma canónica el bloque de las conocidas.
+    Devuelve (matriz, completa).
+    """
+    seed = np.asarray(seed, dtype=int)[:N, :k]
+    out = np.full((N, k), UNKNOWN, dtype=int)
+    out[:seed.shape[0], :seed.shape[1]] = seed
+    out[(out < 0) | (out >= s)] = UNKNOWN
+    known = out != UNKNOWN
+    complete = bool(known.all())
+    if complete:
+        out = canonical_seed(out, s)
+    else:
+        known_cols = np.flatnonzero(known.all(axis=0))
+        if known_cols.size and not known[:, known.any(axis=0) & ~known.all(axis=0)].any():
+            out[:, known_cols] = canonical_seed(out[:, known_cols], s)
+    return out, complete
+
+
+def seed_candidates(seed, universe):
+    """
+    Índices de las filas del universo (ver row_universe.RowUniverse) que
+    coinciden con alguna fila de la semilla en sus celdas conocidas: con un
+    diseño al que falta la última columna, las s filas que extienden cada una
+    de las suyas. Devuelve None si alguna fila de la semilla es del todo
+    desconocida (cualquier fila sería compatible).
+    """
+    seed = np.asarray(seed)
+    if (seed == UNKNOWN).all(axis=1).any():
+        return None
+    candidates = []
+    for row in np.unique(seed, axis=0):
+        free = np.flatnonzero(row == UNKNOWN)
+        base = universe.encode(np.where(row == UNKNOWN, 0, row))
+        values = np.array(list(product(range(universe.s), repeat=len(free))), dtype=np.int64)
+        candidates.append(base + values @ universe.weights[free])
+    return np.unique(np.concatenate(candidates))
+
+
+def complete_seed_rows(seed, s):
+    """
+    Completa las celdas desconocidas de las filas con alguna celda conocida,
+    dando a cada columna los símbolos por turnos (0, 1, ..., s-1, 0, ...) para
+    que quede equilibrada. En general no es una OA: es un punto de partida
+    para búsquedas locales como Hexaly. Devuelve solo las filas completadas.
+    """
+    seed = np.array(seed, dtype=int)
+    seed = seed[(seed != UNKNOWN).any(axis=1)]
+    for j in range(seed.shape[1]):
+        free = np.flatnonzero(seed[:, j] == UNKNOWN)
+        seed[free, j] = np.arange(len(free)) % s
+    return seed
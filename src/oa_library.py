@@ -0,0 +1,118 @@
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from oa_utils import oa_strength, load_oa_csv
+from oa_binary import iter_oa_binary
+
+DATA_DIR = os.path.join("..", "data")
+
+
+class OALibrary:
+    """
+    Biblioteca persistente de OAs ya resueltas y validadas (data/oa_library.sqlite).
+
+    Las matrices se indexan por (N, s, t) con t la fuerza máxima detectada al
+    guardarlas. Como eliminar columnas de una OA(N,k',s,t') con k' >= k y
+    t' >= t da una OA(N,k,s,t) válida, una consulta se responde proyectando
+    la menor matriz guardada que la cubra. También se guardan las instancias
+    demostradas infactibles; si no existe OA(N,k,s,t) tampoco existe para
+    ningún k ni t mayores.
+
+    Al crear la biblioteca se importan las OAs que ya haya en data/ (ver
+    import_data_dir).
+    """
+
+    def __init__(self, filename="oa_library.sqlite", timeout=60):
+        os.makedirs(DATA_DIR, exist_ok=True)
+        self.path = os.path.join(DATA_DIR, filename)
+        nueva = not os.path.exists(self.path)
+        self.conn = sqlite3.connect(self.path, timeout=timeout, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS designs (
+                                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                 N INTEGER, k INTEGER, s INTEGER, t INTEGER,
+                                 method TEXT, timestamp TEXT, data BLOB)""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_designs ON designs (N, s, t, k)")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS infeasible (
+                                 N INTEGER, k INTEGER, s INTEGER, t INTEGER,
+                                 source TEXT, timestamp TEXT,
+                                 PRIMARY KEY (N, k, s, t))""")
+        if nueva:
+            added = self.import_data_dir()
+            if added:
+                print(f"[OALibrary] Biblioteca creada con {added} OAs de data/.")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, oa, method=""):
+        """
+        Valida y guarda una OA. No se guarda si no tiene fuerza >= 1 o si ya
+        hay en la biblioteca otra que la cubre (mismo N y s, k y t mayores o
+        iguales). Devuelve el id del diseño guardado o None.
+        """
+        oa = np.asarray(oa)
+        N, k = oa.shape
+        s = int(oa.max()) + 1
+        t = oa_strength(oa)
+        if t < 1:
+            print("[OALibrary] La matriz no es una OA válida, no se guarda.")
+            return None
+        if self._covering(N, k, s, t) is not None:
+            return None
+        cur = self.conn.execute(
+            "INSERT INTO designs (N, k, s, t, method, timestamp, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (N, k, s, t, method, time.strftime("%Y-%m-%d %H:%M:%S"), oa.astype(np.uint8).tobytes()))
+        print(f"[OALibrary] Guardada OA({N},{k},{s},{t}) ({method}).")
+        return cur.lastrowid
+
+    def _covering(self, N, k, s, t):
+        return self.conn.execute(
+            "SELECT id, k, t, method, data FROM designs WHERE N = ? AND s = ? AND t >= ? AND k >= ? "
+            "ORDER BY k, t LIMIT 1", (N, s, t, k)).fetchone()
+
+    def lookup(self, N, k, s, t):
+        """
+        Devuelve (oa, método de origen) con una OA(N,k,s,t) obtenida proyectando
+        las primeras k columnas de un diseño guardado, o (None, None) si no hay.
+        """
+        row = self._covering(N, k, s, t)
+        if row is None:
+            return None, None
+        _, k_lib, _, method, data = row
+        oa = np.frombuffer(data, dtype=np.uint8).reshape(N, k_lib)[:, :k].astype(int)
+        return oa, method
+
+    def record_infeasible(self, N, k, s, t, source=""):
+        """Registra que está demostrado que no existe OA(N,k,s,t)."""
+        self.conn.execute(
+            "INSERT OR IGNORE INTO infeasible (N, k, s, t, source, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+            (N, k, s, t, source, time.strftime("%Y-%m-%d %H:%M:%S")))
+
+    def is_infeasible(self, N, k, s, t):
+        """True si hay una prueba de no existencia para OA(N,k',s,t') con k' <= k y t' <= t."""
+        return self.conn.execute(
+            "SELECT 1 FROM infeasible WHERE N = ? AND s = ? AND t <= ? AND k <= ? LIMIT 1",
+            (N, s, t, k)).fetchone() is not None
+
+    def import_data_dir(self):
+        """Valida y añade a la biblioteca todos los CSV y archivos binarios (.oab) de data/."""
+        added = 0
+        for fname in sorted(os.listdir(DATA_DIR)):
+            if fname.endswith(".csv"):
+                if self.add(load_oa_csv(fname), method=f"csv:{fname}") is not None:
+                    added += 1
+            elif fname.endswith(".oab"):
+                for oa, header in iter_oa_binary(fname):
+                    if self.add(oa, method=header["method"] or f"oab:{fname}") is not None:
+                        added += 1
+        return added
@@ -1,14 +1,15 @@
 import sys
 import os
 
-from oa_utils import export_oa_to_csv, validate_oa_csv, oa_strength, log_oa_result, check_oa_existence
-from oa_generators.MILP_row_selection import generate_oa_row_selection
-from oa_generators.MILP_cellvars import generate_oa_cellvars
-from oa_generators.MILP_column_by_column import generate_oa_with_backtracking
-from oa_generators.ORT_row_selection import generate_row_ORT
-from oa_generators.ORT_column_by_column import generate_oa_with_backtracking_ORT
-from oa_generators.hexaly_column_by_column import generate_oa_hexaly_column_by_column
-from oa_generators.hexaly_row_bool import generate_oa_row_selection_hexaly
+from oa_utils import (export_oa_to_csv, validate_oa_csv, oa_strength, log_oa_result, check_oa_existence,
+                      count_oa_extensions)
+from oa_methods import INSTANCIAS_PREDEF, METODOS, run_method, acepta
+from oa_generators.instrumentation import RunStats
+from oa_generators.constructions import construct_oa
+from oa_generators.parallel_search import available_cores
+from oa_library import OALibrary
+from oa_binary import write_oa_binary, validate_oa_binary
+from oa_portfolio import run_portfolio
 
 import csv
 
@@ -18,8 +19,9 @@ def main_menu():
         print("1. Generar OA")
         print("2. Validar OA desde archivo CSV")
         print("3. Existe OA con parametros específicos")
-        print("4. Salir")
-        choice = input("Elige opción [1/2/3/4]: ").strip()
+        print("4. Importar a la biblioteca las OAs de data/")
+        print("5. Salir")
+        choice = input("Elige opción [1/2/3/4/5]: ").strip()
         if choice == "1":
             generar_oa()
         elif choice == "2":
@@ -27,10 +29,18 @@ def main_menu():
         elif choice == "3":
             check_existence()
         elif choice == "4":
+            importar_biblioteca()
+        elif choice == "5":
             sys.exit(0)
         else:
             print("Opción no válida.")
 
+def importar_biblioteca():
+    """Añade a la biblioteca los CSV y .oab de data/ (p. ej. los copiados a mano tras crearla)."""
+    with OALibrary() as biblioteca:
+        added = biblioteca.import_data_dir()
+    print(f"📚 {added} OAs nuevas en la biblioteca.")
+
 def check_existence():
     k = int(input("k (columnas): "))
     s = int(input("s (símbolos por columna): "))
@@ -38,21 +48,40 @@ def check_existence():
     λ = int(input("λ (veces que debe aparecer cada t-tupla): "))
     N = λ * (s ** t)
     print(f"\n📐 Calculado: N = λ × s^t = {N}")
-    check_oa_existence(N,k,s,t)
+    workers = available_cores()
+    modo = input("¿Solo existencia (Enter) o contar todas las OAs no isomorfas (c)? ").strip().lower()
+    if modo == "c":
+        counts = count_oa_extensions(N, k, s, t, workers=workers)
+        existe = counts.get(k, 0) > 0
+        print(f"OA({N}, {k}, {s}, {t}): {counts.get(k, 0)} arrays no isomorfos")
+    else:
+        existe = check_oa_existence(N, k, s, t, workers=workers)
+    if not existe:
+        # La enumeración de oapackage es exhaustiva: es una prueba de no existencia
+        with OALibrary() as biblioteca:
+            biblioteca.record_infeasible(N, k, s, t, source="oapackage")
         
 
+def elegir_semilla(N, k, s, t):
+    """Pregunta por una solución inicial (warm start) para el solver; devuelve la matriz o None."""
+    print("\nSolución inicial (warm start):")
+    print("1. Construcción algebraica (Rao–Hamming / Bush)")
+    print("2. Diseño de la biblioteca con una columna menos (la última queda libre)")
+    opcion = input("Elige [1/2] o Enter para empezar sin semilla: ").strip()
+    if opcion == "1":
+        semilla = construct_oa(N, k, s, t)
+    elif opcion == "2":
+        with OALibrary() as biblioteca:
+            semilla, _ = biblioteca.lookup(N, k - 1, s, t)
+    else:
+        return None
+    if semilla is None:
+        print("⚠️ No hay semilla disponible; se empieza sin ella.")
+    return semilla
+
+
 def generar_oa():
-    instancias_predef = [
-        (9, 4, 3, 2),
-        (50, 5, 5, 2),
-        (49, 4, 7, 2),
-        (81, 4, 9, 2),
-        (343, 5, 7, 2),
-        (128, 6, 4, 3),
-        (256, 5, 4, 3),
-        (512, 5, 8, 2),
-        (512, 5, 8, 3),
-    ]
+    instancias_predef = INSTANCIAS_PREDEF
 
     print("\nSelecciona una instancia OA(N,k,s,t) predefinida o introduce parámetros manualmente:")
     for idx, (N, k, s, t) in enumerate(instancias_predef):
@@ -78,57 +107,46 @@ def generar_oa():
         print("⚠️ Entrada inválida. Introduce números enteros.")
         return
 
-    print("\nMétodo de generación:")
-    print("1. Gurobi (Selección de filas - MILP)")
-    print("2. Gurobi (Variables de celda - MILP)")
-    print("3. Gurobi (Columna por columna - MILP)")
-    print("4. CPLEX (Selección de filas - MILP)")
-    print("5. CPLEX (Columna por columna - MILP)")
-    print("6. CBC (Selección de filas - MILP)")
-    print("7. CBC (Columna por columna - MILP)")
-    print("8. OR-Tools (Selección de filas)")
-    print("9. OR-Tools (Columna por columna)")
-    print("10. Hexaly (Selección de filas)")
-    print("11. Hexaly (Columna por columns)")
-
-    metodo = input("Elige método [1/2/3/4/5/6/7/8/9/10/11]: ").strip()
-
-    if metodo == "1":
-        oa, runtime = generate_oa_row_selection(N, k, s, t, verbose=True, solver='gurobi')
-        metodo_nombre = "gurobi_row_selection"
-    elif metodo == "2":
-        oa, runtime = generate_oa_cellvars(N, k, s, t, verbose=True, solver='gurobi')
-        metodo_nombre = "gurobi_cell_vars"
-    elif metodo == "3":
-        oa, runtime = generate_oa_with_backtracking(N, k, s, t, solver='gurobi')
-        metodo_nombre = "gurobi_column_by_column"
-    elif metodo == "4":
-        oa, runtime = generate_oa_row_selection(N, k, s, t, verbose=True, solver='cplex')
-        metodo_nombre = "cplex_row_selection"
-    elif metodo == "5":
-        oa, runtime = generate_oa_with_backtracking(N, k, s, t, solver='cplex')
-        metodo_nombre = "cplex_column_by_column"
-    elif metodo == "6":
-        oa, runtime = generate_oa_row_selection(N, k, s, t, verbose=True, solver='cbc')
-        metodo_nombre = "cbc_row_selection"
-    elif metodo == "7":
-        oa, runtime = generate_oa_with_backtracking(N, k, s, t, solver='cbc')
-        metodo_nombre = "cbc_column_by_column"
-    elif metodo == "8":
-        oa, runtime = generate_row_ORT(N, k, s, t)
-        metodo_nombre = "OR-Tools_row_selection"
-    elif metodo == "9":
-        oa, runtime = generate_oa_with_backtracking_ORT(N, k, s, t)
-        metodo_nombre = "OR-Tools_column_by_column"
-    elif metodo == "10":
-        oa, runtime = generate_oa_row_selection_hexaly(N, k, s, t)
-        metodo_nombre = "hexaly_row_selection"
-    elif metodo == "11":
-        oa, runtime = generate_oa_hexaly_column_by_column(N, k, s, t)
-        metodo_nombre = "hexaly_column_by_column"
+    with OALibrary() as biblioteca:
+        if biblioteca.is_infeasible(N, k, s, t):
+            print(f"❌ Está demostrado que no existe OA({N},{k},{s},{t}); no se resuelve.")
+            return
+        oa_lib, origen = biblioteca.lookup(N, k, s, t)
+
+    desde_biblioteca = False
+    if oa_lib is not None:
+        usar = input(f"📚 La biblioteca ya contiene un diseño que cubre OA({N},{k},{s},{t}) "
+                     f"(origen: {origen}). ¿Usarlo? [S/n]: ").strip().lower()
+        desde_biblioteca = usar != "n"
+
+    if desde_biblioteca:
+        oa, runtime = oa_lib, 0.0
+        metodo_nombre = "library_projection"
     else:
-        print("⚠️ Método no válido.")
-        return
+        print("\nMétodo de generación:")
+        nombres = list(METODOS)
+        for idx, nombre in enumerate(nombres):
+            print(f"{idx+1}. {METODOS[nombre][0]}")
+
+        metodo = input(f"Elige método [{'/'.join(str(i+1) for i in range(len(nombres)))}] "
+                       "(varios separados por comas para lanzarlos en carrera): ").strip()
+        elegidos = [m.strip() for m in metodo.split(",")]
+
+        if not all(m.isdigit() and 1 <= int(m) <= len(nombres) for m in elegidos):
+            print("⚠️ Método no válido.")
+            return
+        extra = {}
+        en_carrera = len(elegidos) > 1
+        if en_carrera:
+            # run_portfolio registra por sí mismo cada método y el resumen
+            oa, runtime, ganador = run_portfolio(N, k, s, t, [nombres[int(m) - 1] for m in elegidos])
+            metodo_nombre = f"portfolio_{ganador}"
+        else:
+            metodo_nombre = nombres[int(elegidos[0]) - 1]
+            if acepta(metodo_nombre, "seed"):
+                extra["seed"] = elegir_semilla(N, k, s, t)
+            stats = RunStats()
+            oa, runtime = run_method(metodo_nombre, N, k, s, t, stats=stats, **extra)
 
     if oa is not None:
         mostrar = input("¿Mostrar OA generado? [s/N]: ").strip().lower()
@@ -137,25 +155,39 @@ def generar_oa():
             for fila in oa:
                 print(fila)
 
-        fname = input(f"Nombre para exportar (defecto: oa_{N}_{k}_{s}_{t}_{metodo_nombre}.csv): ").strip()
+        fname = input(f"Nombre para exportar, .csv o binario .oab "
+                      f"(defecto: oa_{N}_{k}_{s}_{t}_{metodo_nombre}.csv): ").strip()
         if not fname:
             fname = f"oa_{N}_{k}_{s}_{t}_{metodo_nombre}.csv"
-        export_oa_to_csv(oa, fname)
+        if fname.endswith(".oab"):
+            # Se añade al final: un mismo .oab puede guardar varias OAs
+            write_oa_binary(oa, fname, method=metodo_nombre, s=s, t=t)
+        else:
+            export_oa_to_csv(oa, fname)
         print(f"✅ OA exportado a 'data/{fname}' en {runtime} segundos.")
 
-        # Validación y logging
+        if desde_biblioteca:
+            return
+
+        # Validación, logging y alta en la biblioteca
         t_detected = oa_strength(oa)
         feasible = t_detected >= t
-        log_oa_result(N, k, s, t, metodo_nombre, runtime, feasible, quality=None, notes="generado vía CLI")
+        if not en_carrera:
+            notas = "generado vía CLI" + ("; warm start" if extra.get("seed") is not None else "")
+            log_oa_result(N, k, s, t, metodo_nombre, runtime, feasible, quality=None, notes=notas,
+                          metrics=stats.as_metrics())
+        if feasible:
+            with OALibrary() as biblioteca:
+                biblioteca.add(oa, method=metodo_nombre)
     else:
         print("❌ No se pudo generar un OA para esos parámetros.")
 
 
 def validar_oa():
     print("Archivos en la carpeta data/:")
-    archivos = [f for f in os.listdir(os.path.join("..", "data")) if f.endswith(".csv")]
+    archivos = [f for f in os.listdir(os.path.join("..", "data")) if f.endswith((".csv", ".oab"))]
     if not archivos:
-        print("No hay archivos CSV en data/.")
+        print("No hay archivos CSV ni .oab en data/.")
         return
     for idx, fname in enumerate(archivos):
         print(f"{idx+1}. {fname}")
@@ -169,6 +201,9 @@ def validar_oa():
     except ValueError:
         print("Selección no válida.")
         return
+    if archivo.endswith(".oab"):
+        validate_oa_binary(archivo)
+        return
     mostrar = input("¿Mostrar OA cargado? [s/N]: ").strip().lower()
     if mostrar == "s":
         print("\nOA cargado:")
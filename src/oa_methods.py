@@ -0,0 +1,127 @@
+import importlib
+import inspect
+
+from oa_generators.profiling import ResourceProfiler
+from oa_library import OALibrary
+
+# Instancias OA(N,k,s,t) usadas en la comparación
+INSTANCIAS_PREDEF = [
+    (9, 4, 3, 2),
+    (50, 5, 5, 2),
+    (49, 4, 7, 2),
+    (81, 4, 9, 2),
+    (343, 5, 7, 2),
+    (128, 6, 4, 3),
+    (256, 5, 4, 3),
+    (512, 5, 8, 2),
+    (512, 5, 8, 3),
+]
+
+# Métodos de generación: nombre -> (etiqueta, módulo, función, argumentos fijos).
+# El nombre es el que se registra en results/oa_metrics.csv y el orden es el
+# del menú interactivo. Los módulos se importan solo al usarlos, para no exigir
+# todos los solvers instalados.
+METODOS = {
+    "gurobi_row_selection": ("Gurobi (Selección de filas - MILP)",
+                             "oa_generators.MILP_row_selection", "generate_oa_row_selection",
+                             {"verbose": True, "solver": "gurobi"}),
+    "gurobi_row_selection_cached": ("Gurobi (Selección de filas - MILP, modelo en caché)",
+                                    "oa_generators.MILP_row_selection", "generate_oa_row_selection",
+                                    {"verbose": True, "solver": "gurobi", "cache": True}),
+    "gurobi_cell_vars": ("Gurobi (Variables de celda - MILP)",
+                         "oa_generators.MILP_cellvars", "generate_oa_cellvars",
+                         {"verbose": True, "solver": "gurobi"}),
+    "gurobi_column_by_column": ("Gurobi (Columna por columna - MILP)",
+                                "oa_generators.MILP_column_by_column", "generate_oa_with_backtracking",
+                                {"solver": "gurobi"}),
+    "cplex_row_selection": ("CPLEX (Selección de filas - MILP)",
+                            "oa_generators.MILP_row_selection", "generate_oa_row_selection",
+                            {"verbose": True, "solver": "cplex"}),
+    "cplex_column_by_column": ("CPLEX (Columna por columna - MILP)",
+                               "oa_generators.MILP_column_by_column", "generate_oa_with_backtracking",
+                               {"solver": "cplex"}),
+    "cbc_row_selection": ("CBC (Selección de filas - MILP)",
+                          "oa_generators.MILP_row_selection", "generate_oa_row_selection",
+                          {"verbose": True, "solver": "cbc"}),
+    "cbc_column_by_column": ("CBC (Columna por columna - MILP)",
+                             "oa_generators.MILP_column_by_column", "generate_oa_with_backtracking",
+                             {"solver": "cbc"}),
+    "OR-Tools_row_selection": ("OR-Tools (Selección de filas)",
+                               "oa_generators.ORT_row_selection", "generate_row_ORT", {}),
+    "OR-Tools_column_by_column": ("OR-Tools (Columna por columna)",
+                                  "oa_generators.ORT_column_by_column", "generate_oa_with_backtracking_ORT", {}),
+    "hexaly_row_selection": ("Hexaly (Selección de filas)",
+                             "oa_generators.hexaly_row_bool", "generate_oa_row_selection_hexaly", {}),
+    "hexaly_column_by_column": ("Hexaly (Columna por columna)",
+                                "oa_generators.hexaly_column_by_column", "generate_oa_hexaly_column_by_column", {}),
+    "gurobi_column_by_column_persistent": ("Gurobi (Columna por columna - MILP, sesión persistente)",
+                                           "oa_generators.MILP_column_by_column", "generate_oa_with_backtracking",
+                                           {"solver": "gurobi", "persistent": True}),
+    "cbc_column_by_column_persistent": ("CBC (Columna por columna - MILP, modelo reutilizado; relanza cbc en cada resolución)",
+                                        "oa_generators.MILP_column_by_column", "generate_oa_with_backtracking",
+                                        {"solver": "cbc", "persistent": True}),
+    "algebraic_construction": ("Construcción algebraica (Rao–Hamming / Bush)",
+                               "oa_generators.constructions", "generate_oa_construction", {}),
+    "hexaly_row_set": ("Hexaly (Selección de filas - variable de conjunto)",
+                       "oa_generators.hexaly_row_set", "generate_oa_row_set_hexaly", {}),
+    "gurobi_cell_vars_symmetry": ("Gurobi (Variables de celda - MILP, con ruptura de simetrías)",
+                                  "oa_generators.MILP_cellvars", "generate_oa_cellvars",
+                                  {"verbose": True, "solver": "gurobi",
+                                   "lex_rows": True, "symbol_order": True, "fix_first_t": True}),
+    "gurobi_cell_vars_aggregated": ("Gurobi (Variables de celda - MILP, formulación agregada)",
+                                    "oa_generators.MILP_cellvars", "generate_oa_cellvars",
+                                    {"verbose": True, "solver": "gurobi", "formulation": "aggregated"}),
+    "gurobi_column_by_column_parallel": ("Gurobi (Columna por columna - MILP, ramas en paralelo)",
+                                         "oa_generators.MILP_column_by_column", "generate_oa_with_backtracking",
+                                         {"solver": "gurobi", "workers": None}),
+    "OR-Tools_column_by_column_parallel": ("OR-Tools (Columna por columna, ramas en paralelo)",
+                                           "oa_generators.ORT_column_by_column",
+                                           "generate_oa_with_backtracking_ORT", {"workers": None}),
+    "gurobi_cell_vars_reduced": ("Gurobi (Variables de celda - MILP, formulación reducida)",
+                                 "oa_generators.MILP_cellvars", "generate_oa_cellvars",
+                                 {"verbose": True, "solver": "gurobi", "formulation": "reduced"}),
+}
+
+
+# Módulos en los que stats.status == "infeasible" demuestra que no existe la
+# OA: modelos completos que solo rompen simetrías que admite toda OA. La
+# búsqueda columna a columna y Hexaly no lo demuestran.
+MODULOS_EXACTOS = {
+    "oa_generators.MILP_row_selection",
+    "oa_generators.MILP_cellvars",
+    "oa_generators.ORT_row_selection",
+}
+
+
+def _generador(nombre):
+    _, modulo, funcion, _ = METODOS[nombre]
+    return getattr(importlib.import_module(modulo), funcion)
+
+
+def acepta(nombre, parametro):
+    """True si la función del método 'nombre' tiene el argumento 'parametro' (p. ej. seed)."""
+    return parametro in inspect.signature(_generador(nombre)).parameters
+
+
+def run_method(nombre, N, k, s, t, traza_heap=False, **kwargs):
+    """
+    Ejecuta el método de generación 'nombre' sobre OA(N,k,s,t).
+    Los kwargs se añaden (o sustituyen) a los argumentos fijos del método.
+    Si se pasa stats, la llamada se mide con ResourceProfiler (pico de RSS
+    con los solvers hijos, CPU frente a reloj, hilos) y con traza_heap
+    también el pico del heap de Python, que ralentiza la construcción.
+    Si el método es de MODULOS_EXACTOS y el solver demuestra que el modelo
+    es infactible, la instancia se registra como infactible en la biblioteca.
+    Devuelve (oa, runtime) como los generadores.
+    """
+    _, modulo, _, fijos = METODOS[nombre]
+    generador = _generador(nombre)
+    stats = kwargs.get("stats")
+    if stats is None:
+        return generador(N, k, s, t, **{**fijos, **kwargs})
+    with ResourceProfiler(stats, trace_heap=traza_heap):
+        resultado = generador(N, k, s, t, **{**fijos, **kwargs})
+    if stats.status == "infeasible" and modulo in MODULOS_EXACTOS:
+        with OALibrary() as biblioteca:
+            biblioteca.record_infeasible(N, k, s, t, source=nombre)
+    return resultado
@@ -0,0 +1,142 @@
+import argparse
+import multiprocessing as mp
+import os
+import signal
+import time
+
+import numpy as np
+
+from oa_batch import _run_cell, _parse_instancia
+from oa_methods import METODOS
+from oa_utils import oa_strength, log_oa_result
+from oa_store import new_run_id
+
+
+def _recv(conn):
+    """Resultado enviado por la celda, o None si no ha enviado nada."""
+    if not conn.poll():
+        return None
+    try:
+        return conn.recv()
+    except EOFError:
+        return None
+
+
+def run_portfolio(N, k, s, t, metodos, timeout=3600, notes="portfolio",
+                  log_dir=os.path.join("..", "results", "portfolio_logs")):
+    """
+    Lanza a la vez los métodos de 'metodos' sobre OA(N,k,s,t), cada uno en su
+    propio proceso (y grupo de procesos), y se queda con la primera OA que
+    pase la validación. El resto se cancelan matando su grupo entero, con los
+    solvers que hayan lanzado. Un mismo método puede aparecer varias veces;
+    cada entrada es un participante distinto, con su propio log.
+
+    Se registra una fila por participante (portfolio_role = winner /
+    finished si también encontró una OA válida pero después / cancelled /
+    failed, con el tiempo transcurrido al terminar o al ser cancelado en
+    elapsed_sec) y una fila resumen con method="portfolio", todas con el
+    mismo portfolio_id. Devuelve (oa, runtime, método ganador) o
+    (None, None, None) si ningún método encuentra una OA a tiempo.
+    """
+    os.makedirs(log_dir, exist_ok=True)
+    ctx = mp.get_context("fork")
+    portfolio_id = new_run_id()
+    start = time.time()
+
+    def valid(result):
+        oa = result.get("oa") if result else None
+        return oa is not None and np.shape(oa) == (N, k) and oa_strength(oa) >= t
+
+    running = {}  # proceso -> (índice, método, conn)
+    for idx, metodo in enumerate(metodos):
+        log_path = os.path.join(log_dir, f"oa_{N}_{k}_{s}_{t}_{idx}_{metodo}.log")
+        parent_conn, child_conn = ctx.Pipe(duplex=False)
+        p = ctx.Process(target=_run_cell, args=(N, k, s, t, metodo, [], log_path, child_conn))
+        p.start()
+        child_conn.close()
+        running[p] = (idx, metodo, parent_conn)
+        print(f"[oa_portfolio] Lanzado {metodo} sobre OA({N},{k},{s},{t})")
+
+    finished = {}  # índice -> (método, rol, elapsed, resultado)
+    winner = None
+    while running and winner is None and time.time() - start < timeout:
+        time.sleep(0.1)
+        for p in list(running):
+            idx, metodo, conn = running[p]
+            result = _recv(conn)
+            if result is None:
+                if p.is_alive():
+                    continue
+                result = _recv(conn)  # pudo enviarlo y terminar justo después de mirar
+            elapsed = time.time() - start
+            p.join()
+            conn.close()
+            del running[p]
+
+            if valid(result):
+                winner = idx
+                finished[idx] = (metodo, "winner", elapsed, result)
+                print(f"[oa_portfolio] Gana {metodo} en {elapsed:.2f} s")
+                break
+            reason = result["notes"] if result else f"proceso terminado (código {p.exitcode})"
+            finished[idx] = (metodo, "failed", elapsed, result or {"notes": reason})
+            print(f"[oa_portfolio] {metodo} termina sin OA válida tras {elapsed:.2f} s ({reason})")
+
+    # Cancelar los que sigan en marcha; los que ya enviaron su resultado (en
+    # la misma vuelta que el ganador) se registran con él
+    for p, (idx, metodo, conn) in running.items():
+        elapsed = time.time() - start
+        result = _recv(conn)
+        if p.is_alive():
+            os.killpg(p.pid, signal.SIGKILL)
+        p.join()
+        conn.close()
+        if result is not None:
+            role = "finished" if valid(result) else "failed"
+            finished[idx] = (metodo, role, elapsed, result)
+            print(f"[oa_portfolio] {metodo} terminó a la vez que el ganador ({role})")
+            continue
+        finished[idx] = (metodo, "cancelled", elapsed, {})
+        print(f"[oa_portfolio] Cancelado {metodo} tras {elapsed:.2f} s")
+
+    for idx in sorted(finished):
+        metodo, role, elapsed, result = finished[idx]
+        metrics = dict(result.get("metrics") or {})
+        metrics.update({"portfolio_id": portfolio_id, "portfolio_role": role,
+                        "elapsed_sec": round(elapsed, 4)})
+        runtime = result.get("runtime") if role != "cancelled" else None
+        log_oa_result(N, k, s, t, metodo, runtime, role in ("winner", "finished"), quality=None,
+                      notes=f"{notes}; {role}" + (f"; {result['notes']}" if result.get("notes") else ""),
+                      metrics=metrics)
+
+    total = time.time() - start
+    ganador = metodos[winner] if winner is not None else None
+    log_oa_result(N, k, s, t, "portfolio", total if ganador else None, ganador is not None, quality=None,
+                  notes=f"{notes}; ganador: {ganador or 'ninguno'}; métodos: {','.join(metodos)}",
+                  metrics={"portfolio_id": portfolio_id, "portfolio_role": "summary",
+                           "elapsed_sec": round(total, 4)})
+    if ganador is None:
+        return None, None, None
+    return finished[winner][3]["oa"], round(total, 4), ganador
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Lanza en carrera varios métodos sobre la misma OA y se queda con el primero que la encuentre.")
+    parser.add_argument("instancia", help="Índice (1..) de una instancia predefinida o 'N,k,s,t'.")
+    parser.add_argument("--metodos", nargs="+", required=True, choices=list(METODOS),
+                        help="Métodos que compiten.")
+    parser.add_argument("--timeout", type=float, default=3600, help="Límite de tiempo de la carrera (s).")
+    parser.add_argument("--notes", default="portfolio", help="Nota registrada en cada resultado.")
+    args = parser.parse_args(argv)
+
+    N, k, s, t = _parse_instancia(args.instancia)
+    oa, runtime, winner = run_portfolio(N, k, s, t, args.metodos, timeout=args.timeout, notes=args.notes)
+    if oa is None:
+        print(f"[oa_portfolio] Ningún método encontró OA({N},{k},{s},{t}).")
+    else:
+        print(f"[oa_portfolio] OA({N},{k},{s},{t}) encontrada por {winner} en {runtime} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+# Desplazamiento (s) de la media geométrica desplazada, el habitual en las
+# comparativas de solvers MIP: evita que las instancias triviales dominen
+SGM_SHIFT = 10.0
+
+
+def shifted_geomean(values, shift=SGM_SHIFT):
+    """Media geométrica desplazada: exp(mean(log(x + shift))) - shift."""
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return np.nan
+    return float(np.exp(np.log(values + shift).mean()) - shift)
+
+
+def _warm(df, include_cold):
+    # Las ejecuciones sin repeticiones (cold nulo) cuentan como calientes
+    if include_cold or "cold" not in df:
+        return df
+    return df[df["cold"].fillna(0) == 0]
+
+
+def summarize_runs(df, value="runtime_sec", by=("N", "k", "s", "t", "method"), include_cold=False,
+                   shift=SGM_SHIFT):
+    """
+    Resume las repeticiones de cada (instancia, método) de MetricsStore.runs():
+    número de muestras y de ejecuciones factibles, mediana, cuartiles, IQR y
+    media geométrica desplazada de 'value'. Por defecto descarta las
+    ejecuciones en frío (cold = 1); las ejecuciones fallidas cuentan con su
+    tiempo, que en un timeout es el límite.
+    """
+    df = _warm(df, include_cold).dropna(subset=[value])
+    rows = []
+    for key, group in df.groupby(list(by)):
+        x = group[value].to_numpy(dtype=float)
+        q1, median, q3 = np.percentile(x, [25, 50, 75])
+        rows.append(dict(zip(by, key), n=len(x), n_feasible=int(group["feasible"].fillna(0).sum()),
+                         median=median, q1=q1, q3=q3, iqr=q3 - q1, sgm=shifted_geomean(x, shift)))
+    return pd.DataFrame(rows, columns=list(by) + ["n", "n_feasible", "median", "q1", "q3", "iqr", "sgm"])
+
+
+def method_sgm(df, value="runtime_sec", include_cold=False, shift=SGM_SHIFT):
+    """
+    Media geométrica desplazada por método sobre todas las instancias, usando
+    la mediana de las repeticiones de cada instancia como su tiempo.
+    """
+    per_instance = summarize_runs(df, value, include_cold=include_cold, shift=shift)
+    return (per_instance.groupby("method")["median"]
+            .agg(lambda x: shifted_geomean(x, shift)).rename("sgm").reset_index())
@@ -0,0 +1,179 @@
+import os
+import sqlite3
+import time
+import uuid
+
+import pandas as pd
+
+RESULTS_DIR = os.path.join("..", "results")
+
+# Columnas fijas de la tabla de ejecuciones. Las métricas adicionales que
+# lleguen en log_oa_result se añaden como columnas nuevas la primera vez.
+_COLUMNS = [
+    ("run_id", "TEXT NOT NULL"),
+    ("timestamp", "TEXT"),
+    ("N", "INTEGER"),
+    ("k", "INTEGER"),
+    ("s", "INTEGER"),
+    ("t", "INTEGER"),
+    ("method", "TEXT"),
+    ("runtime_sec", "REAL"),
+    ("feasible", "INTEGER"),
+    ("quality", "REAL"),
+    ("notes", "TEXT"),
+    ("build_sec", "REAL"),
+    ("solve_sec", "REAL"),
+    ("extract_sec", "REAL"),
+    ("column_times", "TEXT"),
+    ("baseline_sec", "REAL"),
+    ("baseline_ratio", "REAL"),
+    ("status", "TEXT"),
+    ("solver_status", "TEXT"),
+    ("subproblem_timeouts", "INTEGER"),
+    ("subproblem_failures", "INTEGER"),
+    ("columns_reached", "INTEGER"),
+    ("batch_id", "TEXT"),
+    ("rep", "INTEGER"),
+    ("cold", "INTEGER"),
+    ("solver_seed", "INTEGER"),
+    ("wall_sec", "REAL"),
+    ("cpu_sec", "REAL"),
+    ("children_cpu_sec", "REAL"),
+    ("cpu_wall_ratio", "REAL"),
+    ("peak_rss_mb", "REAL"),
+    ("peak_threads", "INTEGER"),
+    ("rss_source", "TEXT"),
+    ("heap_peak_mb", "REAL"),
+    ("subproblems", "INTEGER"),
+    ("backtracks", "INTEGER"),
+    ("bb_nodes", "REAL"),
+    ("iterations", "REAL"),
+    ("mip_gap", "REAL"),
+    ("model_rows", "INTEGER"),
+    ("model_cols", "INTEGER"),
+    ("model_nnz", "INTEGER"),
+    ("presolved_rows", "INTEGER"),
+    ("presolved_cols", "INTEGER"),
+    ("presolved_nnz", "INTEGER"),
+    ("presolve_source", "TEXT"),
+    ("model_cache", "TEXT"),
+    ("cache_build_sec_saved", "REAL"),
+]
+
+
+def new_run_id():
+    return uuid.uuid4().hex
+
+
+def _native(value):
+    """Convierte escalares de NumPy a tipos de Python que sqlite3 sabe guardar."""
+    return value.item() if hasattr(value, "item") else value
+
+
+def _sql_type(value):
+    if isinstance(value, (bool, int)):
+        return "INTEGER"
+    if isinstance(value, float):
+        return "REAL"
+    return "TEXT"
+
+
+class MetricsStore:
+    """
+    Almacén local de resultados en SQLite (results/oa_metrics.sqlite).
+
+    Cada inserción es una sola transacción (O(1), sin releer el histórico) y
+    el modo WAL con busy_timeout permite varios procesos escribiendo a la vez,
+    como los workers de oa_batch. No se descartan repeticiones: cada ejecución
+    lleva su propio run_id. La primera vez que se crea la base de datos se
+    importa el histórico de results/oa_metrics.csv si existe.
+    """
+
+    def __init__(self, filename="oa_metrics.sqlite", timeout=60):
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        self.path = os.path.join(RESULTS_DIR, filename)
+        self.conn = sqlite3.connect(self.path, timeout=timeout, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(f"PRAGMA busy_timeout={int(timeout * 1000)}")
+        self._ensure_schema()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _columns(self):
+        return {row[1] for row in self.conn.execute("PRAGMA table_info(runs)")}
+
+    def _ensure_schema(self):
+        if self._columns():
+            return
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            if not self._columns():
+                cols = ", ".join(f'"{name}" {sql_type}' for name, sql_type in _COLUMNS)
+                self.conn.execute(f"CREATE TABLE runs (id INTEGER PRIMARY KEY AUTOINCREMENT, {cols})")
+                self.conn.execute("CREATE INDEX idx_runs_instance ON runs (N, k, s, t, method)")
+                self.conn.execute("CREATE INDEX idx_runs_run_id ON runs (run_id)")
+                self._import_csv(os.path.join(RESULTS_DIR, "oa_metrics.csv"))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def _add_missing_columns(self, entry):
+        missing = [key for key in entry if key not in self._columns()]
+        for key in missing:
+            try:
+                self.conn.execute(f'ALTER TABLE runs ADD COLUMN "{key}" {_sql_type(entry[key])}')
+            except sqlite3.OperationalError as e:
+                # Otro proceso la ha añadido entre medias
+                if "duplicate column" not in str(e):
+                    raise
+
+    def _insert(self, entry):
+        keys = list(entry)
+        cols = ", ".join(f'"{key}"' for key in keys)
+        marks = ", ".join("?" for _ in keys)
+        cur = self.conn.execute(f"INSERT INTO runs ({cols}) VALUES ({marks})",
+                                [_native(entry[key]) for key in keys])
+        return cur.lastrowid
+
+    def _import_csv(self, csv_path):
+        if not os.path.exists(csv_path):
+            return
+        df = pd.read_csv(csv_path)
+        for idx, row in enumerate(df.to_dict("records")):
+            entry = {key: (None if pd.isna(value) else value) for key, value in row.items()}
+            entry["run_id"] = f"csv-{idx}"
+            self._add_missing_columns(entry)
+            self._insert(entry)
+
+    def append(self, entry):
+        """Inserta una ejecución y devuelve su id. Añade run_id y timestamp si faltan."""
+        entry = dict(entry)
+        entry.setdefault("run_id", new_run_id())
+        entry.setdefault("timestamp", time.strftime("%Y-%m-%d %H:%M:%S"))
+        self._add_missing_columns(entry)
+        return self._insert(entry)
+
+    def runs(self, where=None, params=()):
+        """
+        Devuelve las ejecuciones como DataFrame. where es una condición SQL
+        opcional, p. ej. runs("N = ? AND method = ?", (50, "gurobi_row_selection")).
+        """
+        query = "SELECT * FROM runs"
+        if where:
+            query += f" WHERE {where}"
+        return pd.read_sql_query(query + " ORDER BY id", self.conn, params=params,
+                                 parse_dates=["timestamp"])
+
+    def export_csv(self, filename="oa_metrics_export.csv"):
+        """Vuelca todas las ejecuciones a un CSV en results/ para intercambio."""
+        file_path = os.path.join(RESULTS_DIR, filename)
+        self.runs().drop(columns=["id"]).to_csv(file_path, index=False)
+        return file_path
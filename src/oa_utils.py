@@ -1,68 +1,243 @@
 import os
 import csv
 import numpy as np
-from itertools import combinations, product
+from itertools import combinations, islice
 import time
-import pandas as pd
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 import oapackage
 
-def check_oa_existence(N,k,s,t):
-    level_vector = [s] * k
-    
-    array_class = oapackage.arraydata_t(level_vector,N,t,k)
+from oa_store import MetricsStore, new_run_id
+from oa_generators.constructions import baseline_seconds
 
-    root = array_class.create_root()
-    current_list = [root]
+# Estado de cada proceso del pool de enumeración (se fija en el initializer)
+_ENUM_CLASS = None
+_ENUM_STOP = None
+
+def _init_enum_worker(N, k, s, t, stop):
+    global _ENUM_CLASS, _ENUM_STOP
+    # arraydata_t no se puede serializar: cada proceso crea el suyo
+    _ENUM_CLASS = oapackage.arraydata_t([s] * k, N, t, k)
+    _ENUM_STOP = stop
+
+def _to_array_link(matrix):
+    return oapackage.array_link(np.ascontiguousarray(matrix, dtype=np.int16))
+
+def _depth_first_exists(al, arrayclass, k, stop=None):
+    """
+    Búsqueda en profundidad de una extensión de al hasta k columnas. Solo
+    guarda en memoria las extensiones de los nodos del camino actual.
+    Devuelve (encontrada, nodos visitados).
+    """
+    if al.n_columns == k:
+        return True, 1
+    nodes = 1
+    for child in oapackage.extend_array(al, arrayclass):
+        if stop is not None and stop.is_set():
+            break
+        found, visited = _depth_first_exists(child, arrayclass, k, stop)
+        nodes += visited
+        if found:
+            return True, nodes
+    return False, nodes
+
+def _subtree_exists(matrix, k):
+    """Tarea del pool: búsqueda en profundidad bajo una extensión de la raíz."""
+    if _ENUM_STOP.is_set():
+        return False, 0
+    found, nodes = _depth_first_exists(_to_array_link(matrix), _ENUM_CLASS, k, _ENUM_STOP)
+    if found:
+        _ENUM_STOP.set()
+    return found, nodes
 
+def _extend_chunk(matrices):
+    """Tarea del pool: extiende un lote de arrays con una columna (matrices (n, N, c))."""
+    children = []
+    for matrix in matrices:
+        children.extend(np.array(al, dtype=np.int8)
+                        for al in oapackage.extend_array(_to_array_link(matrix), _ENUM_CLASS))
+    if not children:
+        return np.empty((0, matrices.shape[1], matrices.shape[2] + 1), dtype=np.int8)
+    return np.stack(children)
+
+def check_oa_existence(N, k, s, t, workers=1, verbose=True):
+    """
+    Decide si existe un OA(N,k,s,t) con la extensión exhaustiva de oapackage
+    (forma normal LMC), así que la respuesta negativa es una prueba.
+
+    La búsqueda es en profundidad y se detiene en la primera OA completa, con
+    memoria acotada por la profundidad y no por el número de arrays de cada
+    nivel. Con workers > 1 los subárboles de las extensiones de la raíz se
+    reparten en un pool de procesos y se cortan todos en cuanto uno encuentra
+    una OA. Para contar todos los arrays de cada nivel ver count_oa_extensions.
+    """
+    start = time.time()
+    array_class = oapackage.arraydata_t([s] * k, N, t, k)
+    root = array_class.create_root()
+    nodes = 0
+    if workers <= 1 or root.n_columns >= k:
+        found, nodes = _depth_first_exists(root, array_class, k)
+    else:
+        ctx = mp.get_context()
+        stop = ctx.Event()
+        found = False
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                       initializer=_init_enum_worker, initargs=(N, k, s, t, stop))
+        try:
+            pending = set()
+            branches = iter(oapackage.extend_array(root, array_class))
+            exhausted = False
+            while True:
+                while not exhausted and not stop.is_set() and len(pending) < 2 * workers:
+                    branch = next(branches, None)
+                    if branch is None:
+                        exhausted = True
+                        break
+                    pending.add(executor.submit(_subtree_exists, np.array(branch), k))
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    branch_found, branch_nodes = future.result()
+                    found = found or branch_found
+                    nodes += branch_nodes
+                if found:
+                    stop.set()
+                    break
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        nodes += 1  # la raíz
 
-    for _ in range(k-t):
-        current_list = oapackage.extend_arraylist(current_list, array_class)
-        print(current_list)
-        if len(current_list) == 0:
+    if verbose:
+        elapsed = time.time() - start
+        print(f"{nodes} arrays visitados en {elapsed:.2f} s ({nodes / max(elapsed, 1e-9):.0f} arrays/s)")
+        if found:
+            print(f"OA({N}, {k}, {s}, {t}) exists!")
+        else:
             print(f"No OA({N}, {k}, {s}, {t}) exists")
-            return False
-        
-    print(f"OA({N}, {k}, {s}, {t}) exists! Found {len(current_list)} arrays")
-    return True   
+    return found
 
-def log_oa_result(N, k, s, t, method, runtime, feasible, quality=None, notes="", filename="oa_metrics.csv"):
+def count_oa_extensions(N, k, s, t, workers=1, chunk_size=1000,
+                        work_dir=os.path.join("..", "results", "existence")):
     """
-    Guarda un registro de resultados de generación OA en results/oa_metrics.csv.
-    Crea el archivo si no existe y evita duplicados por clave (N,k,s,t,method).
+    Enumera nivel a nivel todos los OA(N,c,s,t) no isomorfos (forma normal
+    LMC) para c = t..k sin tener ningún nivel entero en memoria.
+
+    Cada nivel se escribe en work_dir en el formato binario de oapackage
+    (oa_N_k_s_t_c.oa) y el siguiente se obtiene leyéndolo en lotes de
+    chunk_size arrays, que con workers > 1 se extienden en un pool de
+    procesos. Solo se informa del número de arrays y del ritmo de cada nivel.
+    Devuelve {c: nº de arrays con c columnas}; se para en el primer nivel
+    vacío.
     """
-    results_dir = os.path.join("..", "results")
-    os.makedirs(results_dir, exist_ok=True)
-    file_path = os.path.join(results_dir, filename)
+    os.makedirs(work_dir, exist_ok=True)
+    array_class = oapackage.arraydata_t([s] * k, N, t, k)
+    root = array_class.create_root()
+
+    def level_path(c):
+        return os.path.join(work_dir, f"oa_{N}_{k}_{s}_{t}_{c}.oa")
+
+    def read_chunks(c):
+        reader = oapackage.arrayfile_t(level_path(c), 0)
+        try:
+            remaining = reader.narrays
+            while remaining > 0:
+                n = min(chunk_size, remaining)
+                yield np.stack([np.array(reader.readnext(), dtype=np.int8) for _ in range(n)])
+                remaining -= n
+        finally:
+            reader.closefile()
+
+    c = root.n_columns
+    writer = oapackage.arrayfile_t(level_path(c), N, c, -1, oapackage.ABINARY, 8)
+    writer.append_array(_to_array_link(np.array(root)))
+    writer.closefile()
+    counts = {c: 1}
+
+    executor = None
+    if workers > 1:
+        ctx = mp.get_context()
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                       initializer=_init_enum_worker,
+                                       initargs=(N, k, s, t, ctx.Event()))
+    else:
+        _init_enum_worker(N, k, s, t, None)
+    try:
+        while c < k:
+            level_start = time.time()
+            writer = oapackage.arrayfile_t(level_path(c + 1), N, c + 1, -1, oapackage.ABINARY, 8)
+            total = 0
 
-    # Estructura del nuevo resultado
+            def write(children):
+                nonlocal total
+                for matrix in children:
+                    writer.append_array(_to_array_link(matrix))
+                total += len(children)
+
+            if executor is None:
+                for chunk in read_chunks(c):
+                    write(_extend_chunk(chunk))
+            else:
+                # Lotes en vuelo acotados para no acumular resultados en memoria
+                pending = []
+                for chunk in read_chunks(c):
+                    pending.append(executor.submit(_extend_chunk, chunk))
+                    if len(pending) >= 2 * workers:
+                        write(pending.pop(0).result())
+                for future in pending:
+                    write(future.result())
+            writer.closefile()
+
+            c += 1
+            counts[c] = total
+            elapsed = time.time() - level_start
+            print(f"[{c} columnas] {total} arrays en {elapsed:.2f} s "
+                  f"({counts[c - 1] / max(elapsed, 1e-9):.0f} arrays extendidos/s)")
+            if total == 0:
+                break
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+    return counts
+
+def log_oa_result(N, k, s, t, method, runtime, feasible, quality=None, notes="", filename="oa_metrics.sqlite",
+                  metrics=None, run_id=None):
+    """
+    Guarda un registro de resultados de generación OA en el almacén SQLite
+    results/oa_metrics.sqlite (ver oa_store.MetricsStore).
+    Las repeticiones de la misma clave (N,k,s,t,method) se conservan, cada una
+    con su run_id. metrics son columnas adicionales, p. ej. los tiempos por fase
+    de RunStats.as_metrics() (build_sec, solve_sec, extract_sec, column_times).
+    Si OA(N,k,s,t) tiene construcción algebraica se añade su tiempo como
+    referencia (baseline_sec) y el cociente runtime / baseline (baseline_ratio).
+    Devuelve el run_id de la ejecución registrada.
+    """
+    run_id = run_id or new_run_id()
     entry = {
+        "run_id": run_id,
         "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
         "N": N,
         "k": k,
         "s": s,
         "t": t,
         "method": method,
-        "runtime_sec": round(runtime, 4),
+        "runtime_sec": round(runtime, 4) if runtime is not None else None,
         "feasible": feasible,
         "quality": quality,
         "notes": notes
     }
+    if metrics:
+        entry.update(metrics)
+    baseline = baseline_seconds(N, k, s, t)
+    if baseline is not None:
+        entry["baseline_sec"] = round(baseline, 6)
+        if runtime is not None:
+            entry["baseline_ratio"] = round(runtime / max(baseline, 1e-6), 1)
 
-    # Si el archivo existe, cargarlo para evitar duplicados
-    if os.path.exists(file_path):
-        df = pd.read_csv(file_path)
-        is_duplicate = ((df["N"] == N) & (df["k"] == k) & (df["s"] == s) &
-                        (df["t"] == t) & (df["method"] == method)).any()
-        if is_duplicate:
-            print(f"[log_oa_result] Resultado duplicado (N={N}, k={k}, s={s}, t={t}, method={method}), no se guarda.")
-            return
-    else:
-        df = pd.DataFrame()
-
-    # Agregar nueva fila
-    df = pd.concat([df, pd.DataFrame([entry])], ignore_index=True)
-    df.to_csv(file_path, index=False)
-    print(f"[log_oa_result] Resultado registrado en {file_path}")
+    with MetricsStore(filename) as store:
+        store.append(entry)
+    print(f"[log_oa_result] Resultado registrado en {store.path} (run_id={run_id})")
+    return run_id
 
 def export_oa_to_csv(oa_matrix, filename="oa_output.csv"):
     """
@@ -95,48 +270,168 @@ def load_oa_csv(filename):
         oa = np.array([list(map(int, row)) for row in reader])
     return oa
 
-def oa_strength(oa):
+def _tuple_counts(oa, s, col_subsets):
+    """
+    Cuenta las apariciones de cada t-tupla en un lote de subconjuntos de columnas.
+    Cada proyección se codifica como un entero en base s por fila y se cuenta
+    con np.bincount. Devuelve una matriz (len(col_subsets), s^t).
+    """
+    col_subsets = np.asarray(col_subsets, dtype=np.intp)
+    B, t = col_subsets.shape
+    pesos = s ** np.arange(t - 1, -1, -1, dtype=np.int64)
+    codes = oa[:, col_subsets] @ pesos                  # (N, B)
+    codes += np.arange(B, dtype=np.int64) * (s ** t)    # desplazamiento por subconjunto
+    counts = np.bincount(codes.ravel(), minlength=B * s ** t)
+    return counts.reshape(B, s ** t)
+
+def _subset_batches(k, t, N, max_cells=1 << 22):
+    """
+    Genera lotes de t-subconjuntos de columnas de tamaño acotado para que
+    la matriz de códigos (N x lote) no supere max_cells enteros.
+    """
+    batch_size = max(1, max_cells // max(1, N * t))
+    combos = combinations(range(k), t)
+    while True:
+        batch = list(islice(combos, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def _level_deviations(oa, s, k, t, λ_expected):
+    """
+    Comprueba todos los t-subconjuntos de columnas y devuelve
+    {columnas: nº de t-tuplas con frecuencia distinta de λ}.
+    """
+    deviations = {}
+    for batch in _subset_batches(k, t, oa.shape[0]):
+        counts = _tuple_counts(oa, s, batch)
+        bad = (counts != λ_expected).sum(axis=1)
+        for cols, n_bad in zip(batch, bad):
+            if n_bad:
+                deviations[cols] = int(n_bad)
+    return deviations
+
+# Estado de cada proceso del pool de validación (se fija en el initializer)
+_POOL_OA = None
+_POOL_S = None
+_POOL_STOP = None
+
+def _init_strength_worker(oa, s, stop):
+    global _POOL_OA, _POOL_S, _POOL_STOP
+    _POOL_OA, _POOL_S, _POOL_STOP = oa, s, stop
+
+def _batch_deviations(batch, λ_expected):
+    """
+    Tarea del pool: cuenta un lote de subconjuntos y activa la señal de
+    parada compartida en cuanto encuentra uno que viola la fuerza.
+    """
+    if _POOL_STOP.is_set():
+        return {}
+    counts = _tuple_counts(_POOL_OA, _POOL_S, batch)
+    bad = (counts != λ_expected).sum(axis=1)
+    deviations = {cols: int(n_bad) for cols, n_bad in zip(batch, bad) if n_bad}
+    if deviations:
+        _POOL_STOP.set()
+    return deviations
+
+def _level_deviations_parallel(executor, stop, N, k, t, λ_expected, workers):
+    """
+    Reparte los t-subconjuntos entre los procesos del pool manteniendo un número
+    acotado de lotes en vuelo y se detiene en el primer subconjunto que falla.
+    """
+    deviations = {}
+    pending = set()
+    batches = _subset_batches(k, t, N, max_cells=1 << 18)
+    max_in_flight = 4 * workers
+    exhausted = False
+    while True:
+        while not exhausted and not stop.is_set() and len(pending) < max_in_flight:
+            batch = next(batches, None)
+            if batch is None:
+                exhausted = True
+                break
+            pending.add(executor.submit(_batch_deviations, batch, λ_expected))
+        if not pending:
+            break
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            deviations.update(future.result())
+        if deviations:
+            stop.set()
+            for future in pending:
+                future.cancel()
+            break
+    return deviations
+
+def oa_strength(oa, return_deviations=False, workers=1):
     """
     Detecta la fuerza máxima t para la que la matriz oa es un Orthogonal Array.
+
+    Si return_deviations es True devuelve (t, desviaciones), donde desviaciones
+    es un diccionario {columnas: nº de t-tuplas con frecuencia distinta de λ}
+    para los subconjuntos que fallan en el nivel t+1.
+
+    Con workers > 1 los subconjuntos de columnas se reparten en un pool de
+    procesos y la búsqueda se corta en el primer subconjunto que falla, por lo
+    que las desviaciones devueltas son solo las encontradas hasta ese momento.
     """
+    oa = np.asarray(oa, dtype=np.int64)
     N, k = oa.shape
-    s = len(set(oa.flatten()))
-    max_t = k
+    s = len(np.unique(oa))
     found_t = 0
-    for t in range(1, k + 1):
-        λ_expected = N // (s ** t)
-        if N != s ** t * λ_expected:
-            break  # No puede tener fuerza t
-        valid = True
-        for cols in combinations(range(k), t):
-            count = {}
-            for row in oa:
-                key = tuple(row[i] for i in cols)
-                count[key] = count.get(key, 0) + 1
-            for val in product(range(s), repeat=t):
-                if count.get(val, 0) != λ_expected:
-                    valid = False
-                    break
-            if not valid:
+    deviations = {}
+    # Los símbolos deben ser 0..s-1; si no, ni siquiera hay fuerza 1
+    if oa.min() < 0 or oa.max() >= s:
+        return (found_t, deviations) if return_deviations else found_t
+
+    executor = stop = None
+    if workers > 1:
+        ctx = mp.get_context()
+        stop = ctx.Event()
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                       initializer=_init_strength_worker,
+                                       initargs=(oa, s, stop))
+    try:
+        # Un fallo en fuerza t descarta cualquier fuerza mayor: se para ahí
+        for t in range(1, k + 1):
+            λ_expected = N // (s ** t)
+            if N != s ** t * λ_expected:
+                break  # No puede tener fuerza t
+            if executor is None:
+                deviations = _level_deviations(oa, s, k, t, λ_expected)
+            else:
+                deviations = _level_deviations_parallel(executor, stop, N, k, t, λ_expected, workers)
+            if deviations:
                 break
-        if valid:
             found_t = t
-        else:
-            break
-    return found_t
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+    return (found_t, deviations) if return_deviations else found_t
 
-def validate_oa_csv(filename):
+def validate_oa_csv(filename, workers=1):
     """
     Valida un archivo CSV de OA (buscando siempre en data/).
     Imprime dimensiones, símbolos, fuerza máxima y si es OA válida.
+    Con workers > 1 usa la validación paralela con parada temprana.
+    """
+    validate_oa(load_oa_csv(filename), workers=workers)
+
+def validate_oa(oa, workers=1):
+    """
+    Imprime dimensiones, símbolos, fuerza máxima de oa y si es OA válida,
+    con los subconjuntos que fallan en la fuerza siguiente.
     """
-    oa = load_oa_csv(filename)
     N, k = oa.shape
     s = len(set(oa.flatten()))
-    t = oa_strength(oa)
+    t, deviations = oa_strength(oa, return_deviations=True, workers=workers)
     print(f"Dimensiones OA: N = {N}, k = {k}, símbolos distintos s = {s}")
     print(f"Fuerza t máxima detectada: {t}")
     if t > 0:
         print(f"La matriz es una OA válida de fuerza t = {t}.")
     else:
         print("La matriz NO es una OA válida (no cumple fuerza t >= 1).")
+    if deviations:
+        print(f"Subconjuntos que fallan en fuerza {t + 1}: {len(deviations)}")
+        for cols, n_bad in list(deviations.items())[:10]:
+            print(f"  columnas {cols}: {n_bad} tuplas con frecuencia ≠ λ")